@@ -0,0 +1,36 @@
+"""add_recrawl_validators_to_crawler_results
+
+Revision ID: a41c7e9b2d10
+Revises: 801d40b9fdd6
+Create Date: 2026-10-17 09:12:41.208315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c7e9b2d10'
+down_revision: Union[str, None] = '801d40b9fdd6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('crawler_results', sa.Column('etag', sa.Text(), nullable=True))
+    op.add_column('crawler_results', sa.Column('last_modified', sa.Text(), nullable=True))
+    op.add_column('crawler_results', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('crawler_results', sa.Column('links', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.create_index('idx_crawler_results_website_url', 'crawler_results', ['website_id', 'page_url'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_crawler_results_website_url', table_name='crawler_results')
+    op.drop_column('crawler_results', 'links')
+    op.drop_column('crawler_results', 'content_hash')
+    op.drop_column('crawler_results', 'last_modified')
+    op.drop_column('crawler_results', 'etag')
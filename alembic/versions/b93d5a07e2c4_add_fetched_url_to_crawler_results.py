@@ -0,0 +1,28 @@
+"""add_fetched_url_to_crawler_results
+
+Revision ID: b93d5a07e2c4
+Revises: e7b2d4f61c08
+Create Date: 2026-10-17 16:40:12.318904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b93d5a07e2c4'
+down_revision: Union[str, None] = 'e7b2d4f61c08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('crawler_results', sa.Column('fetched_url', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('crawler_results', 'fetched_url')
@@ -0,0 +1,38 @@
+"""create_crawl_checkpoints_table
+
+Revision ID: c5e81f3a9b47
+Revises: a41c7e9b2d10
+Create Date: 2026-10-17 11:02:17.530482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e81f3a9b47'
+down_revision: Union[str, None] = 'a41c7e9b2d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('crawl_checkpoints',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.String(length=64), nullable=False),
+    sa.Column('batch_id', sa.String(length=255), nullable=False),
+    sa.Column('state', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('session_id')
+    )
+    op.create_index(op.f('ix_crawl_checkpoints_batch_id'), 'crawl_checkpoints', ['batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_crawl_checkpoints_batch_id'), table_name='crawl_checkpoints')
+    op.drop_table('crawl_checkpoints')
@@ -0,0 +1,43 @@
+"""add_canonical_page_url_to_gsc_keyword_data
+
+Revision ID: e7b2d4f61c08
+Revises: c5e81f3a9b47
+Create Date: 2026-10-17 14:20:41.118274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from services.canonical_url import url_match_key
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2d4f61c08'
+down_revision: Union[str, None] = 'c5e81f3a9b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('gsc_keyword_data', sa.Column('canonical_page_url', sa.Text(), nullable=True))
+
+    # Backfill once per distinct URL; canonicalization happens in Python, not SQL
+    connection = op.get_bind()
+    keywords = sa.table('gsc_keyword_data', sa.column('page_url', sa.Text()), sa.column('canonical_page_url', sa.Text()))
+    urls = [row.page_url for row in connection.execute(sa.select(keywords.c.page_url).distinct())]
+    update = keywords.update().where(keywords.c.page_url == sa.bindparam('url')).values(
+        canonical_page_url=sa.bindparam('key')
+    )
+    for start in range(0, len(urls), 1000):
+        connection.execute(update, [{"url": url, "key": url_match_key(url)} for url in urls[start:start + 1000]])
+
+    op.create_index('idx_gsc_keyword_data_batch_canonical_url', 'gsc_keyword_data',
+                    ['batch_id', 'canonical_page_url'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_gsc_keyword_data_batch_canonical_url', table_name='gsc_keyword_data')
+    op.drop_column('gsc_keyword_data', 'canonical_page_url')
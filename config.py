@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 import logging
 # Add debug logging
 logging.basicConfig(level=logging.DEBUG)
@@ -26,17 +26,82 @@ class Settings(BaseSettings):
     # Crawler settings
     MAX_WORKERS: int = 5
     TIMEOUT: int = 10
-    MAX_RETRIES: int = 3
+    MAX_RETRIES: int = 3  # retries of a URL after timeouts, connection errors and 429/5xx responses
+    RETRY_BACKOFF_BASE: float = 2.0  # seconds before the first retry; doubles with every further one
+    RETRY_BACKOFF_MAX: float = 60.0  # cap in seconds on the backoff, before jitter and Retry-After
     USER_AGENT: str = "TothetopBot/1.0 (+https://tothetop.cloud)"
-    
+    ROBOTS_CACHE_TTL: int = 86400  # max seconds a host's robots.txt is reused across crawls
+    RESPECT_ROBOTS_TXT: bool = False  # skip URLs disallowed by robots.txt instead of only logging them
+    SITEMAP_DISCOVERY: bool = True  # seed full crawls with the URLs listed in the site's sitemaps
+    SITEMAP_MAX_URLS: int = 50000  # sitemap URLs read per crawl
+    SITEMAP_MAX_FILES: int = 50  # sitemap files (including index children) fetched per crawl
+    FRONTIER_QUEUE_SIZE: int = 1  # URLs handed to workers ahead of time; kept small so new high-priority URLs go first
+    FRONTIER_BLOOM_FILTER: bool = False  # remember queued URLs in a fixed-size Bloom filter instead of a set
+    FRONTIER_BLOOM_CAPACITY: int = 10000000  # URLs the Bloom filter is sized for (~18 MB at 0.1% errors)
+    FRONTIER_BLOOM_ERROR_RATE: float = 0.001  # chance that a new URL is wrongly skipped as already queued
+    FRONTIER_IMPRESSIONS_WEIGHT: float = 1.0  # priority per power of ten of a page's GSC impressions
+    FRONTIER_SITEMAP_PRIORITY_WEIGHT: float = 2.0  # priority per unit of sitemap <priority> (0.5 for linked URLs)
+    FRONTIER_DEPTH_WEIGHT: float = 1.0  # priority lost per link away from the start page
+    RESULT_QUEUE_SIZE: int = 20  # parsed pages waiting to be saved before workers pause
+    HTML_PARSER_BACKEND: str = "lxml"  # "lxml" or "selectolax" (needs the selectolax package)
+    EXTRACTION_WORKERS: int = 2  # processes for HTML extraction, 0 runs it on the event loop
+    EXTRACTION_TASKS_PER_POOL: int = 500  # pages extracted before the process pool is recycled
+    CRAWL_CHECKPOINT_STORE: str = "database"  # "database" (crawl_checkpoints table) or "file"
+    CRAWL_CHECKPOINT_DIR: str = "checkpoints"  # directory for the "file" checkpoint store
+    CRAWL_CHECKPOINT_INTERVAL: int = 30  # seconds between checkpoints of a running crawl
+    HTML_ARCHIVE: bool = False  # keep the fetched HTML of every batch for offline re-extraction (reextract.py)
+    HTML_ARCHIVE_DIR: str = "archives"  # one <batch_id>.warc.gz per batch
+    HTML_ARCHIVE_COMPRESSION: int = 6  # gzip level of archived records
+    CRAWL_EXECUTION: str = "local"  # "local" runs crawls in the API process, "queue" hands them to crawl_worker.py
+    CRAWL_QUEUE_SHARDS: int = 4  # crawl job queues; a host always maps to the same one
+    CRAWL_WORKER_SHARDS: str = ""  # comma-separated shards this worker consumes, empty for all
+    CRAWL_WORKER_CONCURRENCY: int = 2  # crawls a worker runs at once
+    CRAWL_LEASE_TIMEOUT: int = 300  # a worker crawl whose checkpoint is older than this lost its worker and is re-queued
+    HTTP2: bool = True  # negotiate HTTP/2 when the h2 package is installed
+    HTTP_MAX_CONNECTIONS: int = 100  # connections kept by the shared crawler HTTP client
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 10  # concurrent requests to one host across all crawls
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0  # seconds an idle connection stays open for reuse
+    DNS_CACHE_TTL: int = 300  # seconds a host's resolved addresses are reused
+    MAX_PAGE_BYTES: int = 5000000  # larger pages are abandoned mid-download and skipped
+    MAX_REDIRECTS: int = 5  # redirect hops followed per URL before it fails
+    URL_KEEP_QUERY_PARAMS: Dict[str, List[str]] = {}  # host (or "*") -> query params that select different pages; all others are dropped
+    URL_STRIP_TRAILING_SLASH: bool = True  # /about/ and /about are the same page
+    URL_STRIP_INDEX_PAGES: bool = True  # /blog/index.html and /blog/ are the same page
+    URL_RESPECT_CANONICAL: bool = True  # save pages under their same-site <link rel="canonical"> URL
+
     # Content quality thresholds
     MIN_WORD_COUNT: int = 100
     
     # Rate limiting
     REQUEST_DELAY: float = 1.0  # seconds between requests
-    
+    HOST_REQUESTS_PER_SECOND: Optional[float] = None  # starting per-host rate shared by all crawls, defaults to 1 / REQUEST_DELAY
+    HOST_MIN_REQUESTS_PER_SECOND: float = 0.2  # floor of the per-host rate, which adapts with the concurrency window
+    HOST_MAX_REQUESTS_PER_SECOND: float = 20.0  # ceiling of the per-host rate; set to HOST_REQUESTS_PER_SECOND to keep it fixed
+    HOST_RATE_INCREASE: float = 0.5  # requests per second added per second of healthy responses
+    HOST_BURST: int = 2  # requests a host may receive back-to-back before the rate applies
+    HOST_INITIAL_CONCURRENCY: int = 2  # concurrent requests to a new host; adapted from its responses
+    HOST_MIN_CONCURRENCY: int = 1
+    HOST_MAX_CONCURRENCY: int = 8
+    HOST_CONCURRENCY_INCREASE: float = 1.0  # slots added per round trip of healthy responses
+    HOST_CONCURRENCY_DECREASE_FACTOR: float = 0.5  # window multiplier on 429/5xx, errors or slowdowns
+    HOST_LATENCY_FACTOR: float = 3.0  # latency over this multiple of the host's best counts as overload
+    HOST_MAX_RETRY_AFTER: int = 300  # cap in seconds on a Retry-After pause
+
     # Browser settings for Playwright
     PLAYWRIGHT_TIMEOUT: int = 30000  # 30 seconds
+    PLAYWRIGHT_WAIT_POLICY: str = "networkidle"  # "networkidle" (capped), "domcontentloaded" (no extra wait, fastest), "selector" or "load"
+    PLAYWRIGHT_NETWORK_IDLE_TIMEOUT: int = 5000  # cap in ms for the networkidle wait
+    PLAYWRIGHT_WAIT_SELECTOR: str = "h1"  # CSS selector awaited by the "selector" policy
+    PLAYWRIGHT_BLOCKED_RESOURCE_TYPES: List[str] = ["image", "media", "font"]  # aborted during renders
+    PLAYWRIGHT_BLOCKED_DOMAINS: List[str] = [  # analytics/tracker hosts (and subdomains) aborted during renders
+        "google-analytics.com", "googletagmanager.com", "doubleclick.net", "facebook.net",
+        "hotjar.com", "segment.io", "segment.com", "clarity.ms", "intercom.io", "hubspot.com",
+    ]
+    RENDER_FALLBACK_THRESHOLD: int = 3  # fallbacks in a row before a host/path pattern is rendered directly, 0 disables
+    RENDER_PROBE_INTERVAL: int = 25  # direct renders between plain-fetch probes of a pattern
+    BROWSER_POOL_SIZE: int = 4  # warm pages shared by all crawls in the process
+    BROWSER_IDLE_TIMEOUT: int = 300  # seconds before idle pages, then the browser, are closed
+    BROWSER_PAGES_PER_BROWSER: int = 200  # renders before Chromium is restarted
     
     # Trial optimization limit
     TRIAL_OPTIMIZATION_LIMIT: int = 2
@@ -0,0 +1,256 @@
+"""Crawl worker: runs crawls queued by the API (CRAWL_EXECUTION=queue).
+
+Each crawl job goes to the queue shard of its host, so one host is always
+crawled by one worker and per-host rate limits hold across the fleet. Pages
+are saved straight to the database and progress is published back to the API.
+Scale out by adding containers; CRAWL_WORKER_SHARDS picks the shards a worker
+consumes (all by default) and must not overlap between workers.
+
+A job is taken off its queue only when the worker has a free crawl slot, and
+acked as it is taken: crawls outlast RabbitMQ's consumer_timeout, so RabbitMQ
+never redelivers a job. Instead a running crawl saves its checkpoint every
+CRAWL_CHECKPOINT_INTERVAL as a lease; once a checkpoint is CRAWL_LEASE_TIMEOUT
+old its worker died, and any worker re-queues the job on its shard, where it
+continues from the checkpoint.
+
+    python crawl_worker.py
+"""
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
+import pika
+from config import settings
+from crawler import Crawler
+from database import SessionLocal
+from services.browser_pool import browser_pool
+from services.checkpoints import checkpoint_store
+from services.crawl_history import load_page_impressions, load_previous_pages, save_crawl_page
+from services.crawl_queue import (
+    CONTROL_EXCHANGE, CRAWL_JOB_QUEUE, PROGRESS_EXCHANGE, Publisher, connection_params, declare_topology, shard_for
+)
+from services.extraction_pool import extraction_pool
+from services.http_client import http_client_manager
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Fields of routes.PageData, reported to the API for the crawl status page list
+PAGE_FIELDS = ('url', 'title', 'meta_description', 'h1', 'h2', 'h3', 'body_text', 'word_count',
+               'parse_method', 'status', 'error_message')
+
+
+class CrawlWorker:
+    def __init__(self, shards: List[int], concurrency: int):
+        self.shards = shards
+        self.concurrency = concurrency
+        self.loop = None
+        self.running: Dict[str, asyncio.Future] = {}
+        self.stopped: Set[str] = set()
+        # Publishing blocks on the broker, so it runs on its own thread (and connection), in order,
+        # and never stalls the crawls on the event loop
+        self.publisher = Publisher()
+        self.publish_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="progress")
+        self.next_shard = 0
+        self.last_orphan_check = 0.0
+
+    def report(self, session_id: str, **update) -> None:
+        self.publish_thread.submit(self.publish_progress, {"session_id": session_id, **update})
+
+    def publish_progress(self, message: Dict) -> None:
+        try:
+            self.publisher.publish(PROGRESS_EXCHANGE, '', message)
+        except pika.exceptions.AMQPError as e:
+            logger.warning(f"Could not report progress for {message['session_id']}: {str(e)}")
+
+    def save_checkpoint(self, job: Dict, crawler: Crawler, status: str = "running") -> None:
+        try:
+            checkpoint_store.save(job["session_id"], {
+                "batch_id": job["batch_id"],
+                "website_id": job["website_id"],
+                "user_id": job["user_id"],
+                "status": status,
+                "job": job,
+                "crawl": crawler.checkpoint()
+            })
+        except Exception as e:
+            logger.error(f"Error saving checkpoint for session {job['session_id']}: {str(e)}")
+
+    async def keep_lease(self, job: Dict, crawler: Crawler) -> None:
+        """Save the checkpoint every CRAWL_CHECKPOINT_INTERVAL, also while no pages come in."""
+        while True:
+            self.save_checkpoint(job, crawler)
+            await asyncio.sleep(settings.CRAWL_CHECKPOINT_INTERVAL)
+
+    async def run_job(self, job: Dict) -> None:
+        session_id = job["session_id"]
+        db = SessionLocal()
+        lease = None
+        try:
+            previous_pages = load_previous_pages(db, job["website_id"], job["user_id"], job["batch_id"])
+            page_impressions = load_page_impressions(db, job["website_id"], job["user_id"])
+            # A job re-queued after its worker died, or a resumed crawl, continues from the checkpoint
+            checkpoint = checkpoint_store.load(session_id)
+            if checkpoint:
+                logger.info(f"Resuming crawl {session_id} from its checkpoint")
+                crawler = Crawler.from_checkpoint(checkpoint["crawl"], previous_pages=previous_pages,
+                                                  page_impressions=page_impressions)
+            else:
+                crawler = Crawler(job["base_url"], job["batch_id"], selected_urls=job.get("selected_urls"),
+                                  previous_pages=previous_pages, sitemap_only=job.get("sitemap_only", False),
+                                  page_impressions=page_impressions, max_depth=job.get("max_depth"),
+                                  max_pages=job.get("max_pages"), deadline_seconds=job.get("deadline_seconds"))
+
+            def update_progress(total_pages, crawled_pages, current_url):
+                self.report(session_id, status="in_progress", pages_found=total_pages,
+                            pages_crawled=crawled_pages, current_url=current_url,
+                            host_limit=crawler.host_limit())
+
+            crawler.set_progress_callback(update_progress)
+            self.report(session_id, status="starting")
+
+            # The checkpoint is valid at every await: a yielded page stays active until it is saved
+            lease = asyncio.create_task(self.keep_lease(job, crawler))
+            async for page in crawler.crawl():
+                if session_id in self.stopped:
+                    logger.info(f"Crawl for session {session_id} was stopped by user.")
+                    break
+                saved = save_crawl_page(db, page, job["batch_id"], job["website_id"], job["user_id"])
+                if saved:
+                    self.report(session_id, page={field: saved.get(field) for field in PAGE_FIELDS})
+            lease.cancel()
+
+            if session_id in self.stopped:
+                self.stopped.discard(session_id)
+                self.save_checkpoint(job, crawler, status="stopped")
+                status = "stopped"
+            else:
+                checkpoint_store.delete(session_id)
+                status = "completed"
+            self.report(session_id, status=status, statistics=crawler.stats)
+            logger.info(f"Crawl {session_id} {status}")
+        except Exception as e:
+            logger.error(f"Error in crawl job {session_id}: {str(e)}", exc_info=True)
+            self.report(session_id, status="failed", error=str(e))
+            # Resumable by hand, but never re-queued as orphaned: it would likely fail again
+            self.set_checkpoint_status(session_id, "failed")
+        finally:
+            if lease is not None:
+                lease.cancel()
+            db.close()
+
+    def consume(self) -> None:
+        """Blocking RabbitMQ loop, run in a thread; jobs are executed on the event loop."""
+        while True:
+            try:
+                connection = pika.BlockingConnection(connection_params())
+                channel = connection.channel()
+                declare_topology(channel)
+                control_queue = channel.queue_declare(queue='', exclusive=True).method.queue
+                channel.queue_bind(exchange=CONTROL_EXCHANGE, queue=control_queue)
+                channel.basic_consume(queue=control_queue, on_message_callback=self.on_control, auto_ack=True)
+                logger.info(f"Crawl worker consuming shards {self.shards} with {self.concurrency} concurrent crawls")
+                while True:
+                    if time.monotonic() - self.last_orphan_check >= settings.CRAWL_CHECKPOINT_INTERVAL:
+                        self.requeue_orphans(channel)
+                        self.last_orphan_check = time.monotonic()
+                    job = self.take_job(channel) if len(self.running) < self.concurrency else None
+                    if job is None:
+                        # Serves stop requests and heartbeats while waiting for a job or a free slot
+                        connection.process_data_events(time_limit=1)
+                    else:
+                        self.start_job(job)
+            except pika.exceptions.AMQPError as e:
+                logger.error(f"Crawl worker lost RabbitMQ connection: {str(e)}")
+                time.sleep(5)
+
+    def take_job(self, channel) -> Optional[Dict]:
+        """Next job from this worker's shards, taking turns between them; acked as it is taken."""
+        for _ in range(len(self.shards)):
+            shard = self.shards[self.next_shard]
+            self.next_shard = (self.next_shard + 1) % len(self.shards)
+            method, _props, body = channel.basic_get(queue=CRAWL_JOB_QUEUE.format(shard=shard), auto_ack=True)
+            if method is None:
+                continue
+            try:
+                return json.loads(body)
+            except ValueError:
+                logger.error(f"Dropping malformed crawl job: {body[:200]}")
+        return None
+
+    def requeue_orphans(self, channel) -> None:
+        """Put the jobs of crawls whose worker died back on their shard, to continue from their checkpoint."""
+        try:
+            orphans = checkpoint_store.claim_expired(settings.CRAWL_LEASE_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Error looking for orphaned crawls: {str(e)}")
+            return
+        for checkpoint in orphans:
+            job = checkpoint["job"]
+            queue = CRAWL_JOB_QUEUE.format(shard=shard_for(job["base_url"]))
+            channel.basic_publish(exchange='', routing_key=queue, body=json.dumps(job, default=str),
+                                  properties=pika.BasicProperties(delivery_mode=2))
+            logger.warning(f"Crawl {job['session_id']} lost its worker, re-queued it on {queue}")
+
+    def set_checkpoint_status(self, session_id: str, status: str) -> None:
+        try:
+            checkpoint_store.set_status(session_id, status)
+        except Exception as e:
+            logger.error(f"Error updating checkpoint of session {session_id}: {str(e)}")
+
+    def start_job(self, job: Dict) -> None:
+        session_id = job["session_id"]
+        if session_id in self.running:
+            logger.warning(f"Crawl {session_id} is already running here, dropping the duplicate job")
+            return
+        future = asyncio.run_coroutine_threadsafe(self.run_job(job), self.loop)
+        self.running[session_id] = future
+        future.add_done_callback(lambda _future: self.running.pop(session_id, None))
+
+    def on_control(self, channel, method, props, body) -> None:
+        message = json.loads(body)
+        if message.get("type") != "stop":
+            return
+        if message.get("session_id") in self.running:
+            self.loop.call_soon_threadsafe(self.stopped.add, message["session_id"])
+        else:
+            # A stopped crawl of a dead worker must not be taken over; its worker would have saved it "stopped"
+            self.set_checkpoint_status(message["session_id"], "stopped")
+
+    async def run(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        threading.Thread(target=self.consume, daemon=True).start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            extraction_pool.shutdown()
+            await browser_pool.close()
+            await http_client_manager.close()
+            self.publish_thread.submit(self.publisher.close)
+            self.publish_thread.shutdown(wait=True)
+
+
+def main() -> None:
+    if settings.CRAWL_WORKER_SHARDS:
+        shards = [int(shard) for shard in settings.CRAWL_WORKER_SHARDS.split(',')]
+    else:
+        shards = list(range(settings.CRAWL_QUEUE_SHARDS))
+    worker = CrawlWorker(shards, settings.CRAWL_WORKER_CONCURRENCY)
+    try:
+        asyncio.run(worker.run())
+    except KeyboardInterrupt:
+        logger.info("Crawl worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,32 @@
 import asyncio
+import hashlib
 import httpx
-from bs4 import BeautifulSoup, NavigableString, Comment
-from playwright.async_api import async_playwright
+import json
+import heapq
+import math
+import random
+import re
+from lxml import etree
+import lxml.html
+from lxml.html import HtmlElement
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
 import trafilatura
-from urllib.parse import urljoin, urlparse
-from typing import List, Dict, Optional, Set
-from urllib.robotparser import RobotFileParser
+from urllib.parse import urljoin, urlparse, urlunsplit
+from typing import Any, List, Dict, Iterator, Optional, Set, Tuple
 from config import settings
+from services.rate_limiter import host_rate_limiter
+from services.host_concurrency import host_concurrency, parse_retry_after
+from services.robots_cache import robots_cache
+from services.extraction_pool import extraction_pool
+from services.browser_pool import browser_pool
+from services.http_client import http_client_manager
+from services.render_policy import render_policy
+from services.sitemaps import discover_sitemap_urls
+from services.frontier import Frontier
+from services.canonical_url import canonicalizer_for
+from services.html_archive import open_archive
 import logging
-from collections import deque
+from copy import deepcopy
 import time
 from datetime import datetime
 import sys
@@ -40,21 +58,924 @@ logger.addHandler(handler)
 # Test log to verify logging is working
 logger.info("=== Crawler Logger initialized ===")
 
+# huge_tree: without it libxml2 silently drops everything nested deeper than 255 levels,
+# which page builders' wrapper divs easily reach
+HTML_PARSER = lxml.html.HTMLParser(huge_tree=True)
+
+NON_TEXT_TAGS = {'script', 'style', 'template'}
+# Tags written inside <title>
+TITLE_MARKUP = re.compile(r'<[^>]*>')
+
+LINK_HREFS = etree.XPath('//a/@href')
+
+# Text nodes outside script/style/template, matching what BeautifulSoup's get_text() returned
+TEXT_NODES = etree.XPath(
+    './/text()[not(parent::script or parent::style or parent::template)]',
+    smart_strings=False
+)
+
+
+def node_text(element: HtmlElement) -> str:
+    """Concatenated text of an element and its descendants."""
+    return ''.join(TEXT_NODES(element))
+
+
+def clean_text(text: str) -> str:
+    """Clean and normalize text content."""
+    if not text:
+        return ""
+
+    # Replace multiple spaces, tabs, and newlines with a single space
+    text = ' '.join(text.split())
+
+    # Fix common spacing issues
+    text = text.replace(' ,', ',')
+    text = text.replace(' .', '.')
+    text = text.replace(' :', ':')
+    text = text.replace(' ;', ';')
+    text = text.replace('( ', '(')
+    text = text.replace(' )', ')')
+
+    # Ensure proper spacing after punctuation
+    text = text.replace(',', ', ')
+    text = text.replace('.', '. ')
+    text = text.replace(':', ': ')
+    text = text.replace(';', '; ')
+
+    # Clean up any double spaces that might have been created
+    text = ' '.join(text.split())
+
+    return text.strip()
+
+
+def parse_html(html, encoding: Optional[str] = None) -> HtmlElement:
+    """Parse a page once into an lxml tree that the whole extraction pipeline shares."""
+    if isinstance(html, str):
+        html, encoding = html.encode('utf-8'), 'utf-8'
+    parser = HTML_PARSER
+    if encoding:
+        try:
+            parser = lxml.html.HTMLParser(encoding=encoding, huge_tree=True)
+        except LookupError:
+            logger.warning(f"Unknown charset {encoding}, letting lxml detect it")
+    try:
+        return lxml.html.document_fromstring(html, parser=parser)
+    except etree.ParserError:
+        # Empty document
+        return lxml.html.document_fromstring("<html><body></body></html>")
+
+
+class ParserBackend:
+    """Node operations the extraction pipeline needs from an HTML parser.
+
+    Implementations must match BeautifulSoup's get_text() semantics: script,
+    style and template text and comments are not part of an element's text.
+    """
+    name = None
+
+    def parse(self, html, encoding: Optional[str] = None):
+        raise NotImplementedError
+
+    def find_first(self, doc, tag: str):
+        raise NotImplementedError
+
+    def title(self, doc) -> Optional[str]:
+        raise NotImplementedError
+
+    def meta_description(self, doc) -> Optional[str]:
+        raise NotImplementedError
+
+    def body(self, doc):
+        raise NotImplementedError
+
+    def links(self, doc) -> List[str]:
+        raise NotImplementedError
+
+    def canonical(self, doc) -> Optional[str]:
+        """href of <link rel="canonical">, as written."""
+        raise NotImplementedError
+
+    def tag(self, node) -> Optional[str]:
+        """Lowercase tag name, or None for comments and other non-element nodes."""
+        raise NotImplementedError
+
+    def text(self, node) -> str:
+        raise NotImplementedError
+
+    def iter_content(self, node) -> Iterator:
+        """Direct content of node in document order: text strings and child elements.
+
+        Comments are skipped, and so is the text of script/style/template elements.
+        """
+        raise NotImplementedError
+
+    def trafilatura_input(self, doc):
+        """Something trafilatura.extract accepts, safe for it to modify."""
+        raise NotImplementedError
+
+    def scripts(self, doc) -> List[Tuple[Optional[str], Optional[str], str]]:
+        """(id, type, source) of every script element."""
+        raise NotImplementedError
+
+
+class LxmlBackend(ParserBackend):
+    name = "lxml"
+
+    def parse(self, html, encoding: Optional[str] = None) -> HtmlElement:
+        return parse_html(html, encoding)
+
+    def find_first(self, doc: HtmlElement, tag: str) -> Optional[HtmlElement]:
+        return doc.find(f'.//{tag}')
+
+    def title(self, doc: HtmlElement) -> Optional[str]:
+        title_element = doc.find('.//title')
+        if title_element is None:
+            return None
+        # libxml2 parses markup inside <title> into elements; browsers show it as text
+        return title_element.text_content() or None
+
+    def meta_description(self, doc: HtmlElement) -> Optional[str]:
+        meta_desc = doc.xpath('//meta[@name="description"]')
+        return meta_desc[0].get("content") if meta_desc else None
+
+    def body(self, doc: HtmlElement) -> Optional[HtmlElement]:
+        return doc.find('body')
+
+    def links(self, doc: HtmlElement) -> List[str]:
+        return [str(href) for href in LINK_HREFS(doc)]
+
+    def canonical(self, doc: HtmlElement) -> Optional[str]:
+        for link in doc.iter("link"):
+            if "canonical" in (link.get("rel") or "").lower().split() and link.get("href"):
+                return link.get("href").strip()
+        return None
+
+    def tag(self, node: HtmlElement) -> Optional[str]:
+        return node.tag if isinstance(node.tag, str) else None
+
+    def text(self, node: HtmlElement) -> str:
+        return node_text(node)
+
+    def iter_content(self, node: HtmlElement) -> Iterator:
+        if node.text and node.tag not in NON_TEXT_TAGS:
+            yield node.text
+        for child in node:
+            if isinstance(child.tag, str):
+                yield child
+            # Text after a comment still belongs to the parent
+            if child.tail:
+                yield child.tail
+
+    def trafilatura_input(self, doc: HtmlElement) -> HtmlElement:
+        # trafilatura cleans the tree in place
+        return deepcopy(doc)
+
+    def scripts(self, doc: HtmlElement) -> List[Tuple[Optional[str], Optional[str], str]]:
+        return [(script.get("id"), script.get("type"), script.text or "") for script in doc.iter("script")]
+
+
+class SelectolaxBackend(ParserBackend):
+    """lexbor-based parser from the optional selectolax package."""
+    name = "selectolax"
+
+    def __init__(self):
+        try:
+            from selectolax.lexbor import LexborHTMLParser
+        except ImportError:
+            raise RuntimeError("HTML_PARSER_BACKEND=selectolax requires the selectolax package (pip install selectolax)")
+        self.parser_class = LexborHTMLParser
+
+    def parse(self, html, encoding: Optional[str] = None):
+        if isinstance(html, bytes):
+            html = html.decode(encoding or 'utf-8', errors='replace')
+        return self.parser_class(html)
+
+    def find_first(self, doc, tag: str):
+        return doc.css_first(tag)
+
+    def title(self, doc) -> Optional[str]:
+        title_element = doc.css_first('title')
+        if title_element is None:
+            return None
+        # <title> is raw text to lexbor, markup included; drop the tags as the lxml backend does
+        return TITLE_MARKUP.sub('', title_element.text()) or None
+
+    def meta_description(self, doc) -> Optional[str]:
+        meta_desc = doc.css_first('meta[name="description"]')
+        return meta_desc.attributes.get("content") if meta_desc is not None else None
+
+    def body(self, doc):
+        return doc.body
+
+    def links(self, doc) -> List[str]:
+        return [a.attributes.get("href") or "" for a in doc.css('a[href]')]
+
+    def canonical(self, doc) -> Optional[str]:
+        for link in doc.css('link[rel][href]'):
+            if "canonical" in (link.attributes.get("rel") or "").lower().split() and link.attributes.get("href"):
+                return link.attributes["href"].strip()
+        return None
+
+    def tag(self, node) -> Optional[str]:
+        # Text and comment nodes are reported as '-text' / '-comment'
+        return None if node.tag.startswith('-') else node.tag
+
+    def text(self, node) -> str:
+        return ''.join(
+            child.text_content for child in node.traverse(include_text=True)
+            if child.tag == '-text' and child.parent.tag not in NON_TEXT_TAGS
+        )
+
+    def iter_content(self, node) -> Iterator:
+        skip_text = node.tag in NON_TEXT_TAGS
+        for child in node.iter(include_text=True):
+            if child.tag == '-text':
+                if not skip_text:
+                    yield child.text_content
+            elif not child.tag.startswith('-'):
+                yield child
+
+    def trafilatura_input(self, doc) -> HtmlElement:
+        # Parsed here rather than by trafilatura, whose parser drops content nested over 255 levels deep
+        return parse_html(doc.html)
+
+    def scripts(self, doc) -> List[Tuple[Optional[str], Optional[str], str]]:
+        return [
+            (script.attributes.get("id"), script.attributes.get("type"), script.text(deep=True))
+            for script in doc.css("script")
+        ]
+
+
+PARSER_BACKENDS = {
+    "lxml": LxmlBackend,
+    "selectolax": SelectolaxBackend,
+}
+_parser_backends: Dict[str, ParserBackend] = {}
+
+
+def get_parser_backend(name: Optional[str] = None) -> ParserBackend:
+    """Backend instance for name, defaulting to settings.HTML_PARSER_BACKEND."""
+    name = name or settings.HTML_PARSER_BACKEND
+    if name not in _parser_backends:
+        if name not in PARSER_BACKENDS:
+            raise ValueError(f"Unknown HTML parser backend: {name}")
+        _parser_backends[name] = PARSER_BACKENDS[name]()
+    return _parser_backends[name]
+
+
+class TextNode:
+    """An element's tag, its full text and its element children."""
+    __slots__ = ('tag', 'text', 'children')
+
+    def __init__(self, tag: str, text: str, children: List["TextNode"]):
+        self.tag = tag
+        self.text = text
+        self.children = children
+
+
+def build_text_tree(root, backend: "ParserBackend") -> Optional[TextNode]:
+    """Collect the text of every element under root in one bottom-up pass.
+
+    An element with a single text-bearing child reuses that child's string, so
+    deep wrapper chains do not copy their text once per level.
+    """
+    if root is None:
+        return None
+
+    built = {}
+    # Entries are [node, content]; content is filled on the first visit and joined on the second
+    stack = [[root, None]]
+    while stack:
+        entry = stack[-1]
+        node, content = entry
+        if content is None:
+            content = entry[1] = list(backend.iter_content(node))
+            for part in reversed(content):
+                if not isinstance(part, str):
+                    stack.append([part, None])
+            continue
+        stack.pop()
+
+        children = []
+        pieces = []
+        for part in content:
+            if isinstance(part, str):
+                pieces.append(part)
+            else:
+                child = built.pop(id(part))
+                children.append(child)
+                if child.text:
+                    pieces.append(child.text)
+        text = pieces[0] if len(pieces) == 1 else ''.join(pieces)
+        built[id(node)] = TextNode(backend.tag(node), text, children)
+
+    return built[id(root)]
+
+
+def index_main_content(main_content: str) -> Set[str]:
+    """Cleaned blocks of trafilatura's text output, for constant-time lookups.
+
+    trafilatura writes one block per line, prefixes list items with '- ' and
+    joins table cells with ' | ', so those are indexed as blocks too.
+    """
+    segments = set()
+    for line in main_content.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        segments.add(clean_text(line))
+        if line.startswith('- '):
+            line = line[2:]
+            segments.add(clean_text(line))
+        if ' | ' in line:
+            segments.update(clean_text(cell) for cell in line.split(' | '))
+    return segments
+
+
+def extract_content(doc, url: str, backend: ParserBackend) -> Dict:
+    """Extract title, headings and structured full_text from a parsed page."""
+    # Get basic metadata
+    title = backend.title(doc)
+    if title:
+        title = title.strip()
+
+    meta_description = backend.meta_description(doc)
+    logger.info(f"Title in extract_content in crawler.py: {title}")
+    logger.info(f"Meta description in extract_content in crawler.py: {meta_description}")
+
+    # Get the main content using trafilatura
+    try:
+        main_content = trafilatura.extract(backend.trafilatura_input(doc)) or ""
+        logger.info(f"Main content in extract_content in crawler.py: {main_content}")
+    except Exception as e:
+        print(f"Error extracting main content: {e}")
+        main_content = ""
+
+    # Now we need to map the trafilatura content to the original structure
+    structured_content = []
+    seen_content = set()
+
+    if title:
+        structured_content.append({
+            'type': 'title',
+            'content': title,
+            'tag': 'title'
+        })
+        seen_content.add(title)
+
+    if meta_description:
+        structured_content.append({
+            'type': 'meta',
+            'content': meta_description,
+            'tag': 'meta'
+        })
+        seen_content.add(meta_description)
+
+    # Every element's text is assembled once, bottom-up, instead of calling get_text() at every depth
+    root = build_text_tree(backend.body(doc), backend)
+    main_segments = index_main_content(main_content)
+    cleaned = {}
+
+    def clean(raw_text: str) -> str:
+        # Wrapper chains share one text object, so each distinct text is cleaned once
+        text = cleaned.get(raw_text)
+        if text is None:
+            text = cleaned[raw_text] = clean_text(raw_text)
+        return text
+
+    # First, try to find h1 in the original tree
+    h1_element = backend.find_first(doc, 'h1')
+    if h1_element is not None:
+        h1_text = clean_text(backend.text(h1_element))
+        if h1_text and h1_text not in seen_content:
+            structured_content.append({
+                'type': 'heading',
+                'level': 1,
+                'content': h1_text,
+                'tag': 'h1'
+            })
+            seen_content.add(h1_text)
+
+    # Walk the tree in document order; each entry is (node, siblings, index among siblings)
+    stack = [(root, None, 0)] if root is not None else []
+    while stack:
+        node, siblings, index = stack.pop()
+        tag = node.tag
+
+        # Skip unwanted elements
+        if tag in ['script', 'style', 'nav', 'footer', 'iframe', 'form', 'button', 'input']:
+            continue
+
+        # Get the text content
+        text = clean(node.text)
+        if not text or text in seen_content:
+            continue
+
+        # Handle lists separately since they need special processing
+        if tag in ['ul', 'ol']:
+            list_items = []
+            for li in node.children:
+                if li.tag != 'li':
+                    continue
+                li_text = clean(li.text)
+                if li_text and li_text not in seen_content:
+                    list_items.append(li_text)
+                    seen_content.add(li_text)
+
+            if list_items:
+                list_title = None
+                # Look for a title in previous siblings
+                for prev in reversed(siblings[:index] if siblings else []):
+                    if prev.tag not in ('p', 'h1', 'h2', 'h3', 'h4'):
+                        continue
+                    title_text = clean(prev.text)
+                    if title_text and title_text not in seen_content:
+                        list_title = title_text
+                        seen_content.add(title_text)
+                        break
+
+                structured_content.append({
+                    'type': 'list',
+                    'title': list_title,
+                    'items': list_items,
+                    'tag': tag
+                })
+            continue  # Skip processing children for lists
+
+        # Check if this text is one of the blocks trafilatura kept as main content
+        if text in main_segments:
+            if tag == 'h1':
+                structured_content.append({
+                    'type': 'heading',
+                    'level': 1,
+                    'content': text,
+                    'tag': 'h1'
+                })
+                seen_content.add(text)
+            elif tag == 'h2':
+                structured_content.append({
+                    'type': 'heading',
+                    'level': 2,
+                    'content': text,
+                    'tag': 'h2'
+                })
+                seen_content.add(text)
+            elif tag in ['h3', 'h4']:
+                structured_content.append({
+                    'type': 'heading',
+                    'level': 3,
+                    'content': text,
+                    'tag': 'h3'
+                })
+                seen_content.add(text)
+            elif tag == 'p':
+                structured_content.append({
+                    'type': 'paragraph',
+                    'content': text,
+                    'tag': 'p'
+                })
+                seen_content.add(text)
+
+        # Process children, first child on top of the stack
+        children = node.children
+        for child_index in range(len(children) - 1, -1, -1):
+            stack.append((children[child_index], children, child_index))
+
+    body_text = main_content  # Use trafilatura's output for body_text
+    result = build_page_result(url, title, meta_description, structured_content, seen_content, body_text)
+    logger.info(f"Result in extract_content in crawler.py: {result}")
+
+    return result
+
+
+def build_page_result(url: str, title: Optional[str], meta_description: Optional[str],
+                      structured_content: List[Dict], seen_content: Set[str], body_text: str,
+                      parse_method: str = "basic") -> Dict:
+    """Turn structured content into the page dict saved as a CrawlerResult."""
+    # Create full_text with structure
+    full_text_parts = []
+    h1_text = None
+    h2_tags = []
+    h3_tags = []
+
+    for item in structured_content:
+        if item['type'] == 'title':
+            full_text_parts.append(f"[TITLE_START]\n{item['content']}\n[TITLE_END]")
+        elif item['type'] == 'meta':
+            full_text_parts.append(f"[META_START]\n{item['content']}\n[META_END]")
+        elif item['type'] == 'heading':
+            if item['level'] == 1:
+                h1_text = item['content']
+                full_text_parts.append(f"[H1_START]\n{item['content']}\n[H1_END]")
+            elif item['level'] == 2:
+                h2_tags.append(item['content'])
+                full_text_parts.append(f"[H2_START]\n{item['content']}\n[H2_END]")
+            elif item['level'] == 3:
+                h3_tags.append(item['content'])
+                full_text_parts.append(f"[H3_START]\n{item['content']}\n[H3_END]")
+        elif item['type'] == 'paragraph':
+            full_text_parts.append(f"[P_START]\n{item['content']}\n[P_END]")
+        elif item['type'] == 'list':
+            # Only add the title if it exists and hasn't been added before
+            if item.get('title') and item['title'] not in seen_content:
+                full_text_parts.append(f"[P_START]\n{item['title']}\n[P_END]")
+                seen_content.add(item['title'])
+            # Add the list items
+            list_text = "\n".join(f"• {list_item}" for list_item in item['items'])
+            full_text_parts.append(f"[LIST_START]\n{list_text}\n[LIST_END]")
+
+
+    full_text = "\n\n".join(full_text_parts)
+
+    # Calculate word count
+    word_count = sum(len(item.get('content', '').split()) for item in structured_content)
+    word_count += sum(len(item.get('items', [])) for item in structured_content if item['type'] == 'list')
+
+    result = {
+        "url": url,
+        "title": title,
+        "meta_description": meta_description,
+        "h1": h1_text,
+        "h2": h2_tags,
+        "h3": h3_tags,
+        "body_text": body_text,
+        "full_text": full_text,
+        "word_count": word_count,
+        "parse_method": parse_method,
+        "status": "partial" if word_count < settings.MIN_WORD_COUNT else "success"
+    }
+    return result
+
+
+# Keys whose string values are headings, and the level they get after the first one became the h1
+EMBEDDED_HEADING_KEYS = {'headline': 2, 'title': 2, 'heading': 2, 'subtitle': 3, 'subheading': 3}
+# JSON-LD types whose "name" is a heading rather than a person, brand or image name
+EMBEDDED_NAMED_TYPES = {
+    'Article', 'BlogPosting', 'NewsArticle', 'TechArticle', 'WebPage', 'AboutPage', 'FAQPage',
+    'Question', 'Product', 'Service', 'Course', 'Event', 'Recipe', 'HowTo', 'HowToStep', 'HowToSection'
+}
+EMBEDDED_DESCRIPTION_KEYS = ('description', 'metaDescription', 'seoDescription', 'excerpt')
+# Build/runtime metadata that never holds page content
+EMBEDDED_SKIP_KEYS = {
+    'buildId', 'query', 'locale', 'locales', 'defaultLocale', 'runtimeConfig', 'config', 'i18n',
+    '__typename', '@context', '@id', 'id', 'slug', 'url', 'href', 'src', 'image', 'logo', 'sameAs',
+    'isFallback', 'gssp', 'scriptLoader', 'dynamicIds', 'appGip', 'serverRendered', 'routePath', 'fetch'
+}
+# Nuxt 3 wraps reactive values as ["Reactive", index] in its __NUXT_DATA__ payload
+NUXT_WRAPPERS = {'Reactive', 'ShallowReactive', 'Ref', 'ShallowRef', 'EmptyRef', 'EmptyShallowRef', 'NuxtError'}
+EMBEDDED_MIN_WORDS = 6  # shorter strings are labels, ids or button text
+EMBEDDED_MAX_NODES = 50000
+HTML_FRAGMENT = re.compile(r'<(p|h[1-6]|li|div|br|strong|em|a)\b', re.IGNORECASE)
+# A JS string literal and the object key it is assigned to, if any
+JS_STRING = re.compile(r'(?:([A-Za-z_$][\w$]*)\s*:\s*)?"((?:[^"\\]|\\.)*)"')
+
+
+def revive_nuxt_payload(payload: List) -> Any:
+    """Rebuild the object graph of a Nuxt 3 payload, where values are indices into one flat array."""
+    revived = {}
+
+    def revive(index, depth=0):
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < len(payload) or depth > 50:
+            return None
+        if index in revived:
+            return revived[index]
+        value = payload[index]
+        if isinstance(value, list):
+            if len(value) == 2 and value[0] in NUXT_WRAPPERS:
+                result = revive(value[1], depth + 1)
+            else:
+                result = [revive(item, depth + 1) for item in value]
+        elif isinstance(value, dict):
+            result = {key: revive(item, depth + 1) for key, item in value.items()}
+        else:
+            result = value
+        revived[index] = result
+        return result
+
+    return revive(0)
+
+
+def embedded_payloads(scripts: List[Tuple[Optional[str], Optional[str], str]]) -> List[Any]:
+    """Decoded JSON state embedded by Next.js, Nuxt and schema.org markup."""
+    payloads = []
+    for script_id, script_type, source in scripts:
+        source = source.strip()
+        if not source:
+            continue
+        try:
+            if script_id == '__NEXT_DATA__':
+                data = json.loads(source)
+                page_props = data.get('props', {}).get('pageProps') if isinstance(data, dict) else None
+                payloads.append(page_props or data)
+            elif script_id == '__NUXT_DATA__':
+                data = json.loads(source)
+                payloads.append(revive_nuxt_payload(data) if isinstance(data, list) else data)
+            elif script_type == 'application/ld+json':
+                payloads.append(json.loads(source))
+            elif source.startswith('window.__NUXT__'):
+                state = source.split('=', 1)[1].strip().rstrip(';')
+                try:
+                    payloads.append(json.loads(state))
+                except ValueError:
+                    # Nuxt 2 usually serialises state as a JS function call; keep its string literals
+                    payloads.append([
+                        {key: json.loads(f'"{literal}"')} if key else json.loads(f'"{literal}"')
+                        for key, literal in JS_STRING.findall(state)
+                    ])
+        except ValueError as e:
+            logger.info(f"Could not decode embedded state in {script_id or script_type or 'script'}: {str(e)}")
+    return payloads
+
+
+def extract_embedded_state(doc, url: str, backend: ParserBackend) -> Optional[Dict]:
+    """Build the page structure from JSON state embedded in the HTML of a client-rendered page.
+
+    Next.js (__NEXT_DATA__), Nuxt (__NUXT_DATA__ / window.__NUXT__) and JSON-LD
+    payloads often carry the whole article, so these pages need no browser.
+    Returns None when the page has no embedded state with any content.
+    """
+    payloads = embedded_payloads(backend.scripts(doc))
+    if not payloads:
+        return None
+
+    title = backend.title(doc)
+    if title:
+        title = title.strip()
+    meta_description = backend.meta_description(doc)
+
+    headings = []  # (level, text) in document order; the first one becomes the h1
+    blocks = []  # structured content items after the h1
+    description = None
+    seen = set()
+    nodes = 0
+
+    def add_heading(text: str, level: int) -> None:
+        text = clean_text(text)
+        if text and text not in seen:
+            seen.add(text)
+            headings.append(text)
+            blocks.append({'type': 'heading', 'level': level, 'content': text, 'tag': f'h{level}'})
+
+    def add_paragraph(text: str) -> None:
+        text = clean_text(text)
+        if text and text not in seen:
+            seen.add(text)
+            blocks.append({'type': 'paragraph', 'content': text, 'tag': 'p'})
+
+    def add_html(fragment: str) -> None:
+        try:
+            root = lxml.html.fragment_fromstring(fragment, create_parent='div')
+        except (etree.ParserError, ValueError):
+            return
+        list_items = []
+        for element in root.iter('h1', 'h2', 'h3', 'h4', 'p', 'li'):
+            text = node_text(element)
+            if element.tag == 'li':
+                text = clean_text(text)
+                if text and text not in seen:
+                    seen.add(text)
+                    list_items.append(text)
+                continue
+            if list_items:
+                blocks.append({'type': 'list', 'title': None, 'items': list_items, 'tag': 'ul'})
+                list_items = []
+            if element.tag == 'p':
+                add_paragraph(text)
+            else:
+                add_heading(text, min(int(element.tag[1]), 3))
+        if list_items:
+            blocks.append({'type': 'list', 'title': None, 'items': list_items, 'tag': 'ul'})
+
+    def add_text(text: str) -> None:
+        if HTML_FRAGMENT.search(text):
+            add_html(text)
+            return
+        for line in text.splitlines():
+            line = line.strip()
+            # Markdown headings from headless CMS fields
+            if line.startswith('#'):
+                level = len(line) - len(line.lstrip('#'))
+                add_heading(line.lstrip('#'), 2 if level <= 2 else 3)
+            elif len(line.split()) >= EMBEDDED_MIN_WORDS:
+                add_paragraph(line)
+
+    # Depth-first over the payloads, children pushed in reverse to keep document order
+    stack = [(payload, None, None) for payload in reversed(payloads)]
+    while stack and nodes < EMBEDDED_MAX_NODES:
+        value, key, parent = stack.pop()
+        nodes += 1
+        if isinstance(value, dict):
+            if '@graph' in value and isinstance(value['@graph'], list):
+                stack.append((value['@graph'], '@graph', value))
+                continue
+            for child_key in reversed(list(value)):
+                if child_key not in EMBEDDED_SKIP_KEYS:
+                    stack.append((value[child_key], child_key, value))
+        elif isinstance(value, list):
+            for item in reversed(value):
+                stack.append((item, key, parent))
+        elif isinstance(value, str) and value.strip():
+            if key in EMBEDDED_DESCRIPTION_KEYS and description is None:
+                description = clean_text(value)
+                continue
+            node_type = parent.get('@type') if isinstance(parent, dict) else None
+            is_heading = key in EMBEDDED_HEADING_KEYS or (
+                key == 'name' and isinstance(node_type, str) and node_type in EMBEDDED_NAMED_TYPES
+            )
+            if is_heading and len(value) < 300:
+                add_heading(value, EMBEDDED_HEADING_KEYS.get(key, 2))
+            else:
+                add_text(value)
+
+    if not blocks:
+        return None
+
+    structured_content = []
+    seen_content = set()
+    if title:
+        structured_content.append({'type': 'title', 'content': title, 'tag': 'title'})
+        seen_content.add(title)
+    meta_description = meta_description or description
+    if meta_description:
+        structured_content.append({'type': 'meta', 'content': meta_description, 'tag': 'meta'})
+        seen_content.add(meta_description)
+
+    # The first heading is the page heading; everything else keeps its level
+    page_heading = headings[0] if headings else None
+    for block in blocks:
+        if block['type'] == 'heading' and block['content'] == page_heading:
+            block.update({'level': 1, 'tag': 'h1'})
+        if block.get('content') in seen_content:
+            continue
+        structured_content.append(block)
+        seen_content.update(block.get('items') or [block.get('content')])
+
+    body_text = "\n".join(block['content'] for block in blocks if block['type'] == 'paragraph')
+    return build_page_result(url, title, meta_description, structured_content, seen_content, body_text, "embedded_json")
+
+
+# Links to these are not fetched at all; the Content-Type check catches the rest
+SKIPPED_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.bmp', '.tif', '.tiff',
+    '.mp4', '.webm', '.mov', '.avi', '.mkv', '.mp3', '.wav', '.ogg',
+    '.zip', '.gz', '.tgz', '.rar', '.7z', '.tar', '.dmg', '.exe', '.apk',
+    '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.csv', '.css', '.js', '.json', '.xml',
+    '.woff', '.woff2', '.ttf', '.eot'
+)
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+# hrefs that never lead to another page of the site ('#...' points back at the page itself)
+IGNORED_HREF_PREFIXES = ('#', 'javascript:', 'mailto:', 'tel:', 'data:')
+
+
+class SkippedResponse(Exception):
+    """A response that is not extracted: not HTML, or larger than MAX_PAGE_BYTES."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+def is_skipped_url(url: str) -> bool:
+    return urlparse(url).path.lower().endswith(SKIPPED_EXTENSIONS)
+
+
+async def read_html_body(response: httpx.Response) -> bytes:
+    """Body of a streamed response, abandoned as soon as it proves not to be HTML or too large."""
+    content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+    # A missing Content-Type is common on small sites; let the parser decide
+    if content_type and content_type not in HTML_CONTENT_TYPES:
+        raise SkippedResponse("not_html", f"Content-Type {content_type}")
+
+    content_length = response.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > settings.MAX_PAGE_BYTES:
+        raise SkippedResponse("too_large", f"Content-Length {content_length} over {settings.MAX_PAGE_BYTES} bytes")
+
+    chunks = []
+    size = 0
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        # Also catches chunked and compressed bodies that only turn out large while downloading
+        if size > settings.MAX_PAGE_BYTES:
+            raise SkippedResponse("too_large", f"Body over {settings.MAX_PAGE_BYTES} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+# Statuses worth another try later: the host is overloaded or briefly broken
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class RetryableResponse(Exception):
+    """A response with one of RETRY_STATUSES, with the delay its Retry-After header asked for."""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def retry_error_class(error: Exception) -> Optional[str]:
+    """Class of a transient fetch error for the retry statistics, None if retrying would not help."""
+    if isinstance(error, RetryableResponse):
+        return f"http_{error.status_code}"
+    if isinstance(error, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(error, httpx.ConnectError):
+        return "connect_error"
+    if isinstance(error, httpx.RemoteProtocolError):
+        return "protocol_error"
+    if isinstance(error, httpx.NetworkError):
+        return "network_error"
+    if isinstance(error, PlaywrightTimeoutError):
+        return "render_timeout"
+    return None
+
+
+def is_thin(page_data: Dict) -> bool:
+    """True when a page is missing its title, h1 or enough words to be usable."""
+    return (
+        not page_data.get("title") or
+        not page_data.get("h1") or
+        (page_data.get("word_count", 0) < settings.MIN_WORD_COUNT)
+    )
+
+
+def extract_page(html, url: str, encoding: Optional[str] = None) -> Dict:
+    """Parse raw HTML and extract its content and links.
+
+    Runs in the extraction process pool, so arguments and the result must stay picklable.
+    """
+    backend = get_parser_backend()
+    parse_start = time.perf_counter()
+    # Parse the raw bytes once and reuse the tree for content and link extraction
+    doc = backend.parse(html, encoding)
+    page_data = extract_content(doc, url, backend)
+    if is_thin(page_data):
+        # Client-rendered pages often ship their content as JSON state; try it before a browser
+        embedded = extract_embedded_state(doc, url, backend)
+        if embedded is not None and embedded["h1"] and embedded["word_count"] > page_data["word_count"]:
+            page_data = embedded
+    page_data["links"] = backend.links(doc)
+    page_data["canonical_url"] = backend.canonical(doc)
+    page_data["parse_time_seconds"] = round(time.perf_counter() - parse_start, 4)
+    return page_data
+
 class Crawler:
-    def __init__(self, base_url: str, batch_id: str, selected_urls=None):
+    def __init__(self, base_url: str, batch_id: str, selected_urls=None, previous_pages: Optional[Dict[str, Dict]] = None,
+                 sitemap_only: bool = False, page_impressions: Optional[Dict[str, int]] = None,
+                 max_depth: Optional[int] = None, max_pages: Optional[int] = None,
+                 deadline_seconds: Optional[int] = None):
         self.base_url = base_url
         self.batch_id = batch_id
         self.selected_urls = selected_urls
         self.only_selected = selected_urls is not None
-        self.domain = urlparse(base_url).netloc
-        self.url_queue = deque([base_url])
-        self.visited_urls: Set[str] = set()
+        # Crawl only the URLs listed in sitemaps instead of following links
+        self.sitemap_only = sitemap_only
+        # Validators and links of the previous batch, keyed by URL (see services.crawl_history)
+        self.previous_pages = previous_pages or {}
+        # GSC impressions by canonical URL (see services.crawl_history); raise a URL's frontier priority
+        self.page_impressions = page_impressions or {}
+        # Crawl budget: links deeper than max_depth are not queued, and no new URL is started
+        # once max_pages were started or deadline_seconds have passed
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.deadline_seconds = deadline_seconds
+        self.deadline: Optional[float] = None
+        self.pages_dispatched = 0
+        # URL variants of one page share a canonical form; see services.canonical_url
+        self.canonicalizer = canonicalizer_for(urlparse(base_url).hostname)
+        self.domain = urlparse(self.clean_url(base_url)).netloc
+        # Every page is queued at most once, whichever URL variant is found first, and the
+        # most valuable pages are crawled first; see services.frontier
+        self.url_queue = Frontier(
+            bloom_capacity=settings.FRONTIER_BLOOM_CAPACITY if settings.FRONTIER_BLOOM_FILTER else None,
+            bloom_error_rate=settings.FRONTIER_BLOOM_ERROR_RATE,
+            key=self.normalize_url
+        )
+        if selected_urls:
+            for url in selected_urls:
+                url = self.clean_url(url)
+                self.url_queue.add(url, self.score(url, 0), 0)
+        else:
+            start_url = self.clean_url(base_url)
+            self.url_queue.add(start_url, self.score(start_url, 0), 0)
         self.processed_urls: Set[str] = set()
+        # Taken from the queue but not yet handed to the consumer, with their (depth, score);
+        # re-queued when resuming
+        self.active_urls: Dict[str, Tuple[int, float]] = {}
+        # Canonical URL of a redirect (or rel=canonical) source -> of its target; the target is
+        # crawled (or off-site), so the source never is again
+        self.redirects: Dict[str, str] = {}
+        # Heap of (ready_at, order, url, depth, score) of URLs that failed transiently, fed back
+        # to the workers once their backoff has passed; retry_attempts counts retries per page key
+        self.retry_queue: List[Tuple[float, int, str, int, float]] = []
+        self.retry_attempts: Dict[str, int] = {}
+        self.retries_scheduled = 0
+        self.resumed = False
+        # Raw HTML of the batch for offline re-extraction (HTML_ARCHIVE); see reextract.py
+        self.archive = open_archive(batch_id)
         self.results: List[Dict] = []
-        self.browser = None
         self.semaphore = asyncio.Semaphore(settings.MAX_WORKERS)
-        self.last_request_time = 0
-        self.request_delay = settings.REQUEST_DELAY
         self.progress_callback = None
         self.status = "starting"
         self.pages_found = 0
@@ -70,7 +991,21 @@ class Crawler:
             "successful_pages": 0,
             "failed_pages": 0,
             "failed_urls": [],
-            "parse_time_seconds": 0
+            "parse_time_seconds": 0,
+            "html_parse_seconds": 0,
+            "render_seconds": 0,
+            "render_timings": [],
+            "render_decisions": {"http_only": 0, "fallback": 0, "fallback_unhelpful": 0, "direct_render": 0},
+            "unchanged_pages": {"not_modified": 0, "same_hash": 0},
+            "skipped_responses": {"not_html": 0, "too_large": 0, "redirect_off_site": 0, "redirect_to_crawled": 0,
+                                  "canonical_duplicate": 0},
+            "canonical_pages": 0,
+            "redirects": {"hops_followed": 0, "redirected_pages": 0, "resolved_from_map": 0},
+            "retries": {"scheduled": 0, "succeeded": 0, "gave_up": 0, "by_error": {}},
+            "sitemap_urls": 0,
+            "archived_records": 0,
+            "budget_stop": None,
+            "frontier_remaining": 0
         }
         
         self.session_data = {
@@ -81,23 +1016,127 @@ class Crawler:
         'current_url': None
          }
         
-        # Initialize robots.txt parser with more logging
-        self.robots_parser = RobotFileParser()
-        robots_url = f"{base_url}/robots.txt"
-        logger.info(f"Attempting to fetch robots.txt from: {robots_url}")
-        self.robots_parser.set_url(robots_url)
-        try:
-            self.robots_parser.read()
-            logger.info("Successfully read robots.txt")
-        except Exception as e:
-            logger.warning(f"Could not read robots.txt: {str(e)}")
-            logger.info("Proceeding without robots.txt restrictions")
-            self.robots_parser = None
+        # robots.txt rules are loaded asynchronously when the crawl starts
+        self.robots_rules = None
+
+    def checkpoint(self) -> Dict:
+        """Snapshot of the crawl to resume from, valid once every yielded page has been saved."""
+        active = {self.normalize_url(url) for url in self.active_urls}
+        # A redirect target being fetched in place of an active URL is not saved yet either
+        active |= {self.redirects[url] for url in active if url in self.redirects}
+        return {
+            "base_url": self.base_url,
+            "batch_id": self.batch_id,
+            "selected_urls": self.selected_urls,
+            "sitemap_only": self.sitemap_only,
+            "max_depth": self.max_depth,
+            "max_pages": self.max_pages,
+            "deadline_seconds": self.deadline_seconds,
+            "frontier": self.url_queue.to_state(
+                unfinished=[(url, depth, score) for url, (depth, score) in self.active_urls.items()] +
+                           [(url, depth, score) for _, _, url, depth, score in self.retry_queue]
+            ),
+            "processed": [url for url in self.processed_urls if url not in active],
+            "redirects": {source: target for source, target in self.redirects.items() if source not in active}
+        }
+
+    @classmethod
+    def from_checkpoint(cls, state: Dict, previous_pages: Optional[Dict[str, Dict]] = None,
+                        page_impressions: Optional[Dict[str, int]] = None) -> "Crawler":
+        """Crawler that continues a checkpointed crawl without refetching saved pages.
+
+        The deadline starts over; max_pages still counts the pages crawled before the checkpoint.
+        """
+        crawler = cls(state["base_url"], state["batch_id"], selected_urls=state["selected_urls"],
+                      previous_pages=previous_pages, sitemap_only=state["sitemap_only"],
+                      page_impressions=page_impressions, max_depth=state.get("max_depth"),
+                      max_pages=state.get("max_pages"), deadline_seconds=state.get("deadline_seconds"))
+        redirects = state.get("redirects", {})
+        crawler.url_queue = Frontier.from_state(
+            state["frontier"],
+            key=crawler.normalize_url,
+            bloom_capacity=settings.FRONTIER_BLOOM_CAPACITY if settings.FRONTIER_BLOOM_FILTER else None,
+            bloom_error_rate=settings.FRONTIER_BLOOM_ERROR_RATE,
+            # Saved pages and redirect sources and targets were queued before; the filter is not checkpointed
+            remembered=[*state["processed"], *redirects, *redirects.values()]
+        )
+        crawler.processed_urls = set(state["processed"])
+        crawler.redirects = redirects
+        crawler.pages_crawled = len(crawler.processed_urls)
+        crawler.pages_dispatched = crawler.pages_crawled
+        crawler.pages_found = crawler.url_queue.enqueued
+        crawler.resumed = True
+        return crawler
 
     def normalize_url(self, url: str) -> str:
-        """Remove fragments and normalize the URL"""
-        parsed = urlparse(url)
-        return f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+        """Canonical form identifying the page at url, used as its key throughout the crawl."""
+        return self.canonicalizer.canonicalize(url)
+
+    def clean_url(self, url: str) -> str:
+        """url without its fragment and ignored query parameters; this is what gets fetched."""
+        return self.canonicalizer.clean(url)
+
+    def host_limit(self) -> Dict:
+        """Current adaptive concurrency of the crawled host, for the crawl status."""
+        return host_concurrency.get_metrics(self.domain)
+
+    def score(self, url: str, depth: int, sitemap_priority: float = 0.5, key: Optional[str] = None) -> float:
+        """Frontier priority of url: GSC impressions, sitemap priority and a shallow depth raise it."""
+        impressions = self.page_impressions.get(key or self.normalize_url(url), 0)
+        return (
+            settings.FRONTIER_IMPRESSIONS_WEIGHT * math.log10(1 + impressions) +
+            settings.FRONTIER_SITEMAP_PRIORITY_WEIGHT * sitemap_priority -
+            settings.FRONTIER_DEPTH_WEIGHT * depth
+        )
+
+    def budget_exhausted(self) -> bool:
+        """Whether max_pages or the deadline forbid starting another URL."""
+        if self.stats["budget_stop"]:
+            return True
+        if self.max_pages is not None and self.pages_dispatched >= self.max_pages:
+            reason = "max_pages"
+        elif self.deadline is not None and time.monotonic() >= self.deadline:
+            reason = "deadline"
+        else:
+            return False
+        logger.info(f"Crawl of {self.base_url} stopped by {reason} with {len(self.url_queue)} URLs left in the frontier")
+        self.stats["budget_stop"] = reason
+        return True
+
+    def retries_pending(self) -> bool:
+        """Whether URLs are waiting out a retry backoff; the deadline drops them, max_pages does not."""
+        return bool(self.retry_queue) and (self.deadline is None or time.monotonic() < self.deadline)
+
+    def schedule_retry(self, url: str, page_key: str, depth: int, error: Exception, error_class: str,
+                       redirect_keys: List[str]) -> bool:
+        """Put url back after exponential backoff with jitter, or at Retry-After. False once MAX_RETRIES are used."""
+        attempt = self.retry_attempts.get(page_key, 0)
+        if attempt >= settings.MAX_RETRIES:
+            self.stats["retries"]["gave_up"] += 1
+            return False
+        self.retry_attempts[page_key] = attempt + 1
+
+        backoff = min(settings.RETRY_BACKOFF_MAX, settings.RETRY_BACKOFF_BASE * 2 ** attempt)
+        # Half fixed, half random, so the failures of one burst do not all come back together
+        delay = backoff / 2 + random.uniform(0, backoff / 2)
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            delay = max(delay, min(retry_after, settings.HOST_MAX_RETRY_AFTER))
+
+        # The page, and any redirect targets it claimed, are fetched again by the retry
+        self.processed_urls.discard(page_key)
+        for key in redirect_keys:
+            self.processed_urls.discard(key)
+        self.redirects.pop(page_key, None)
+
+        score = self.active_urls.get(url, (depth, 0.0))[1]
+        self.retries_scheduled += 1
+        heapq.heappush(self.retry_queue, (time.monotonic() + delay, self.retries_scheduled, url, depth, score))
+        self.stats["retries"]["scheduled"] += 1
+        by_error = self.stats["retries"]["by_error"]
+        by_error[error_class] = by_error.get(error_class, 0) + 1
+        logger.info(f"Retrying {url} in {delay:.1f}s (attempt {attempt + 1} of {settings.MAX_RETRIES}) after {error_class}: {str(error)}")
+        return True
     
     def set_progress_callback(self, callback):
         """Set callback function for progress updates."""
@@ -166,44 +1205,149 @@ class Crawler:
 
     async def crawl(self):
         self.stats["start_time"] = datetime.now()
-        if self.selected_urls:  
-            self.url_queue = deque(self.selected_urls)
+        if self.deadline_seconds:
+            self.deadline = time.monotonic() + self.deadline_seconds
+        if self.resumed:
+            logger.info(f"Resuming crawl in crawler.py with {len(self.url_queue)} queued URLs and {len(self.processed_urls)} already saved")
+        elif self.selected_urls:  
             logger.info(f"Starting crawl in crawler.py for with {len(self.url_queue)} selected URLs")
         logger.info(f"Starting crawl in crawler.py for {self.base_url}")
         logger.info(f"Initializing crawler with settings: MAX_WORKERS={settings.MAX_WORKERS}")
-        async with async_playwright() as p:
-            logger.info("Playwright initialized successfully")
-            self.browser = await p.chromium.launch()
-            logger.info("Browser launched successfully")
-            async with httpx.AsyncClient(
-                timeout=settings.TIMEOUT,
-                headers={"User-Agent": settings.USER_AGENT},
-                limits=httpx.Limits(max_connections=settings.MAX_WORKERS)
-            ) as client:
-                logger.info("HTTP client initialized successfully")
-                while self.url_queue:
-                    batch = []
-                    for _ in range(settings.MAX_WORKERS):
-                        if not self.url_queue:
-                            break
-                        batch.append(self.url_queue.popleft())
-                    logger.info(f"Processing {len(batch)} URLs")
-                    tasks = [
-                        self.process_url_with_semaphore(url, client)
-                        for url in batch
-                    ]
-                    results = await asyncio.gather(*tasks)
-                    logger.info("All tasks completed")
-                    for page in results:
-                        if page:  # Only yield valid pages
-                            yield page
-            await self.browser.close()
-            logger.info("Browser closed successfully")
+        # The shared browser pool starts Chromium only when a page needs rendering
+        # Shared by all crawls in the process, so warm connections to the host are reused
+        client = http_client_manager.get_client()
+        self.robots_rules = await robots_cache.get_rules(client, self.base_url)
+        if not self.resumed and not self.only_selected and (settings.SITEMAP_DISCOVERY or self.sitemap_only):
+            await self.seed_from_sitemaps(client)
+        async for page in self.run_worker_pool(client):
+            yield page
         self.stats["end_time"] = datetime.now()
         self.stats["parse_time_seconds"] = (self.stats["end_time"] - self.stats["start_time"]).total_seconds()
-        self.stats["total_pages_found"] = len(self.processed_urls) + len(self.url_queue)
+        self.stats["total_pages_found"] = self.url_queue.enqueued
+        # URLs still waiting for a retry when the deadline passed are left over too
+        self.stats["frontier_remaining"] = len(self.url_queue) + len(self.retry_queue)
+        self.stats["rate_limiter"] = host_rate_limiter.get_metrics(self.domain)
+        self.stats["host_concurrency"] = host_concurrency.get_metrics(self.domain)
+        self.stats["browser_pool"] = browser_pool.get_metrics()
+        self.stats["http_client"] = http_client_manager.get_metrics()
+        self.stats["render_policy"] = render_policy.get_metrics(self.domain)
         logger.info(f"Final statistics after crawl in crawler.py: {self.stats}")
-        
+
+    async def seed_from_sitemaps(self, client: httpx.AsyncClient) -> None:
+        """Queue every same-site URL from the sitemaps, in sitemap priority/lastmod order."""
+        if self.max_depth is not None and self.max_depth < 1:
+            return
+        robots_sitemaps = self.robots_rules.sitemaps if self.robots_rules else []
+        entries = await discover_sitemap_urls(client, self.base_url, robots_sitemaps)
+        for entry in entries:
+            url = self.clean_url(entry.loc)
+            if (
+                url in self.url_queue or
+                is_skipped_url(url) or
+                not self.is_same_domain(url) or
+                not self.is_allowed(url)
+            ):
+                continue
+            # Sitemap URLs count as linked from the start page
+            self.url_queue.add(url, self.score(url, 1, entry.priority), 1)
+            self.stats["sitemap_urls"] += 1
+        logger.info(f"Seeded {self.stats['sitemap_urls']} URLs from sitemaps for {self.base_url}")
+
+        if self.sitemap_only and not self.stats["sitemap_urls"]:
+            logger.warning(f"No sitemap URLs found for {self.base_url}, following links instead")
+            self.sitemap_only = False
+
+    async def run_worker_pool(self, client: httpx.AsyncClient):
+        """Run MAX_WORKERS long-lived workers over the frontier and yield pages in completion order."""
+        frontier = asyncio.Queue(maxsize=settings.FRONTIER_QUEUE_SIZE)
+        # Bounded so a slow consumer (database writes) pauses the workers instead of buffering pages
+        results = asyncio.Queue(maxsize=settings.RESULT_QUEUE_SIZE)
+        self.in_flight = 0
+        self.frontier_changed = asyncio.Event()
+
+        feeder = asyncio.create_task(self.feed_frontier(frontier))
+        workers = [
+            asyncio.create_task(self.crawl_worker(frontier, results, client))
+            for _ in range(settings.MAX_WORKERS)
+        ]
+
+        async def close_results():
+            await asyncio.gather(*workers)
+            await results.put(None)
+
+        closer = asyncio.create_task(close_results())
+        try:
+            while True:
+                item = await results.get()
+                if item is None:
+                    break
+                url, page = item
+                yield page
+                # Resumed only once the consumer saved the page; a consumer that stops instead
+                # leaves it active, so the checkpoint queues it again
+                self.active_urls.pop(url, None)
+        finally:
+            tasks = [feeder, closer, *workers]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info("Worker pool shut down")
+
+    async def feed_frontier(self, frontier: asyncio.Queue) -> None:
+        """Move queued URLs into the bounded frontier until nothing is queued, in flight or waiting to be
+        retried, or the budget is spent."""
+        while True:
+            if self.retries_pending() and self.retry_queue[0][0] <= time.monotonic():
+                # A retry was already counted against max_pages when it was first dispatched
+                _, _, url, depth, score = heapq.heappop(self.retry_queue)
+                self.active_urls[url] = (depth, score)
+                self.in_flight += 1
+                await frontier.put((url, depth))
+                continue
+            if self.url_queue and not self.budget_exhausted():
+                url, depth, score = self.url_queue.pop()
+                self.active_urls[url] = (depth, score)
+                self.in_flight += 1
+                self.pages_dispatched += 1
+                await frontier.put((url, depth))
+                continue
+            if self.in_flight == 0 and not self.retries_pending():
+                break
+            # Wait for a worker to finish (and possibly queue new links), or for the next retry to be due;
+            # workers never sleep through a backoff themselves
+            self.frontier_changed.clear()
+            timeout = None
+            if self.retries_pending():
+                timeout = self.retry_queue[0][0] - time.monotonic()
+                if self.deadline is not None:
+                    timeout = min(timeout, self.deadline - time.monotonic())
+            try:
+                await asyncio.wait_for(self.frontier_changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        # One stop marker per worker
+        for _ in range(settings.MAX_WORKERS):
+            await frontier.put(None)
+
+    async def crawl_worker(self, frontier: asyncio.Queue, results: asyncio.Queue, client: httpx.AsyncClient) -> None:
+        """Fetch URLs from the frontier one at a time until a stop marker arrives."""
+        while True:
+            item = await frontier.get()
+            if item is None:
+                return
+            url, depth = item
+            page = None
+            try:
+                page = await self.process_url_with_semaphore(url, client, depth)
+            finally:
+                self.in_flight -= 1
+                self.frontier_changed.set()
+            if page:  # Only yield valid pages
+                await results.put((url, page))
+            else:
+                self.active_urls.pop(url, None)
+
     # Old method - save once everything is parsed 
     # async def process_url_with_semaphore(self, url: str, client: httpx.AsyncClient):
     #     """Process URL with semaphore for concurrency control"""
@@ -217,17 +1361,10 @@ class Crawler:
     #         self.last_request_time = time.time()
     #         await self.process_url(url, client)
 
-    async def process_url_with_semaphore(self, url: str, client: httpx.AsyncClient):
+    async def process_url_with_semaphore(self, url: str, client: httpx.AsyncClient, depth: int = 0):
         """Process URL with semaphore for concurrency control"""
         async with self.semaphore:
-            # Rate limiting
-            now = time.time()
-            time_since_last_request = now - self.last_request_time
-            if time_since_last_request < self.request_delay:
-                await asyncio.sleep(self.request_delay - time_since_last_request)
-            
-            self.last_request_time = time.time()
-            return await self.process_url(url, client)
+            return await self.process_url(url, client, depth)
 
     # Old method - save results once the crawling is done
     # async def process_url(self, url: str, client: httpx.AsyncClient) -> None:
@@ -310,29 +1447,32 @@ class Crawler:
     #                 pass  # Semaphore was already released
     
 
-    async def process_url(self, url: str, client: httpx.AsyncClient) -> None:
-        """Process a single URL and extract its content."""
-        current_url = self.normalize_url(url)
+    async def process_url(self, url: str, client: httpx.AsyncClient, depth: int = 0) -> None:
+        """Process a single URL and extract its content; depth is its distance in links from the start."""
+        current_url = self.clean_url(url)
+        page_key = self.normalize_url(url)
         logger.info(f"🔄 Processing URL in process_url in crawler.py: {current_url}")
-        # Skip PDFs
-        if current_url.lower().endswith('.pdf'):
-            logger.info(f"Skipping PDF file: {current_url}")
+        # Skip PDFs, images, archives and other files that are never HTML
+        if is_skipped_url(current_url):
+            logger.info(f"Skipping non-HTML file: {current_url}")
             return
         
-        if current_url in self.processed_urls:
+        if page_key in self.processed_urls:
             return
             
         if not self.is_allowed(current_url):
             logger.info(f"Skip: URL not allowed in process_url in crawler.py: {current_url}")
             return
             
+        # Keys of the redirect targets this fetch claims, released again if it is retried
+        redirect_keys: List[str] = []
         try:
-            self.processed_urls.add(current_url)
+            self.processed_urls.add(page_key)
             self.stats["pages_parsed"] += 1
             
-            # Update these values with more stable counts
+            # Both counts are maintained incrementally, so this is constant time
             self.pages_crawled = len(self.processed_urls)
-            self.pages_found = len(self.processed_urls | self.visited_urls | set(self.url_queue))
+            self.pages_found = self.url_queue.enqueued
             self.current_url = current_url
             
             self.session_data.update({
@@ -348,29 +1488,45 @@ class Crawler:
             if self.progress_callback:
                 self.progress_callback(self.pages_found, self.pages_crawled, current_url)
             
-            # Try basic parsing first
-            response = await client.get(current_url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            # Extract content using basic parsing
-            page_data = await self.extract_content_basic(soup, current_url)
-            
-            logger.info(f"Page data in process_url in crawler.py: {page_data}")
-            
-            # Check if we need to try Playwright
-            if self.needs_playwright(page_data):
-                logger.info(f"Trying Playwright for {current_url}")
-                page_data = await self.extract_content_playwright(current_url)
+            if render_policy.should_render_first(current_url):
+                # This part of the site has needed the browser every time, skip the plain fetch
+                logger.info(f"Rendering {current_url} directly with Playwright")
+                page_data = await self.extract_content_playwright(current_url, redirect_keys)
+                links = page_data.pop("links")
+                if page_data["url"] != current_url:
+                    page_data["redirected_from"] = current_url
+                self.stats["render_decisions"]["direct_render"] += 1
+            else:
+                page_data, links = await self.fetch_and_extract(current_url, client, redirect_keys)
+
+            if page_key in self.retry_attempts:
+                self.stats["retries"]["succeeded"] += 1
+
+            page_data = self.apply_canonical(page_data, page_key)
+            if page_data is None:
+                # Another URL of an already crawled page; its links may still be new
+                if not self.only_selected and not self.sitemap_only:
+                    await self.extract_and_queue_urls(links, current_url, depth + 1)
+                return None
             
             self.results.append(page_data)
             self.stats["successful_pages"] += 1
             
-            # Extract and queue new URLs
-            if not self.only_selected:
-                await self.extract_and_queue_urls(soup, current_url)
+            # Extract and queue new URLs, relative to where a redirect ended up
+            if not self.only_selected and not self.sitemap_only:
+                await self.extract_and_queue_urls(links, page_data.get("url", current_url), depth + 1)
             logger.info(f"Extracted and queued URLs in process_url in crawler.py")
             return page_data
+
+        except SkippedResponse as e:
+            logger.info(f"Skipping {current_url}: {str(e)}")
+            self.stats["skipped_responses"][e.reason] += 1
+            return None
             
         except Exception as e:
+            error_class = retry_error_class(e)
+            if error_class and self.schedule_retry(url, page_key, depth, e, error_class, redirect_keys):
+                return None
             logger.error(f"Error processing {current_url}: {str(e)}")
             self.results.append({
                 "url": current_url,
@@ -383,40 +1539,175 @@ class Crawler:
                 "error": str(e)
             })
             return None
-        finally:
-            # Ensure semaphore is released
-            if hasattr(self, 'semaphore'):
-                try:
-                    self.semaphore.release()
-                except ValueError:
-                    pass  # Semaphore was already released
 
-    def clean_text(self, text: str) -> str:
-        """Clean and normalize text content."""
-        if not text:
-            return ""
-        
-        # Replace multiple spaces, tabs, and newlines with a single space
-        text = ' '.join(text.split())
-        
-        # Fix common spacing issues
-        text = text.replace(' ,', ',')
-        text = text.replace(' .', '.')
-        text = text.replace(' :', ':')
-        text = text.replace(' ;', ';')
-        text = text.replace('( ', '(')
-        text = text.replace(' )', ')')
-        
-        # Ensure proper spacing after punctuation
-        text = text.replace(',', ', ')
-        text = text.replace('.', '. ')
-        text = text.replace(':', ': ')
-        text = text.replace(';', '; ')
+    async def fetch_and_extract(self, url: str, client: httpx.AsyncClient, redirect_keys: Optional[List[str]] = None):
+        """Plain HTTP fetch and extraction, redone in the browser when the content is missing.
+
+        The keys of redirect targets claimed on the way are appended to redirect_keys.
+        """
+        if redirect_keys is None:
+            redirect_keys = []
+        source_url = url
+        source_key = self.normalize_url(url)
+        hops = 0
+        # Set once a 304 came back for a page there is nothing to carry forward from
+        unconditional = False
+        while True:
+            previous = None if unconditional else self.previous_pages.get(self.normalize_url(url))
+            headers = {"Cache-Control": "no-cache"} if unconditional else {}
+            if previous:
+                if previous["etag"]:
+                    headers["If-None-Match"] = previous["etag"]
+                if previous["last_modified"]:
+                    headers["If-Modified-Since"] = previous["last_modified"]
+
+            host = urlparse(url).netloc
+            # The host's adaptive concurrency window, then its politeness rate (adapted along with it)
+            async with host_concurrency.slot(host) as outcome:
+                await host_rate_limiter.acquire(host)
+                request_start = time.perf_counter()
+                # Streamed, so non-HTML and oversized bodies are dropped before they are downloaded
+                async with client.stream("GET", url, headers=headers) as response:
+                    outcome.record(response, time.perf_counter() - request_start)
+                    if response.status_code in RETRY_STATUSES:
+                        raise RetryableResponse(response.status_code,
+                                                parse_retry_after(response.headers.get("retry-after")))
+                    if not response.has_redirect_location:
+                        if previous and response.status_code == 304:
+                            logger.info(f"Not modified since the last crawl: {url}")
+                            self.stats["unchanged_pages"]["not_modified"] += 1
+                            return self.unchanged_page(url, previous, response.headers.get("etag"), response.headers.get("last-modified"), source_url), previous["links"]
+                        if response.status_code == 304:
+                            if unconditional:
+                                raise Exception("304 Not Modified for an unconditional request")
+                            # Validators this crawl did not send (an intermediary's); ask for the page itself
+                            logger.info(f"Unexpected 304 for {url}, requesting it again unconditionally")
+                            unconditional = True
+                            continue
+                        body = await read_html_body(response)
+                        break
+                    location = response.headers["location"]
+            if hops == settings.MAX_REDIRECTS:
+                raise Exception(f"More than {settings.MAX_REDIRECTS} redirects")
+            hops += 1
+            url = self.follow_redirect(source_key, url, location)
+            redirect_keys.append(self.normalize_url(url))
+
+        if self.archive is not None:
+            await self.archive_page(self.archive.write_response, url, response.status_code,
+                                    response.reason_phrase, response.headers.raw, body)
+
+        content_hash = hashlib.sha256(body).hexdigest()
+        if previous and previous["content_hash"] == content_hash:
+            logger.info(f"Content unchanged since the last crawl: {url}")
+            self.stats["unchanged_pages"]["same_hash"] += 1
+            return self.unchanged_page(url, previous, response.headers.get("etag"), response.headers.get("last-modified"), source_url), previous["links"]
+
+        # Raw bytes go to the parser with the declared charset; without one it reads <meta charset>
+        page_data = await self.extract_content_basic(body, url, response.charset_encoding)
+        links = page_data.pop("links")
+        if previous is None and page_data.get("canonical_url") and settings.URL_RESPECT_CANONICAL:
+            # Saved under its rel=canonical URL last time, by a crawl that did not record this alias
+            canonical_previous = self.previous_pages.get(self.normalize_url(urljoin(url, page_data["canonical_url"])))
+            if canonical_previous and canonical_previous["content_hash"] == content_hash:
+                logger.info(f"Content unchanged since the last crawl of its canonical URL: {url}")
+                self.stats["unchanged_pages"]["same_hash"] += 1
+                return self.unchanged_page(url, canonical_previous, response.headers.get("etag"), response.headers.get("last-modified"), source_url), canonical_previous["links"]
+        if url != source_url:
+            page_data["redirected_from"] = source_url
         
-        # Clean up any double spaces that might have been created
-        text = ' '.join(text.split())
+        logger.info(f"Page data in process_url in crawler.py: {page_data}")
         
-        return text.strip()
+        # Check if we need to try Playwright
+        if not self.needs_playwright(page_data):
+            self.stats["render_decisions"]["http_only"] += 1
+            render_policy.record(url, rendered=False)
+            # Only the raw HTML was used, so its validators describe the extracted content
+            page_data.update({
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "content_hash": content_hash,
+                "links": links
+            })
+            return page_data, links
+
+        logger.info(f"Trying Playwright for {url}")
+        page_data = await self.extract_content_playwright(url)
+        page_data.pop("links")
+        if url != source_url:
+            page_data["redirected_from"] = source_url
+        # Only learn to render first when rendering actually produced the content
+        helped = not self.needs_playwright(page_data)
+        self.stats["render_decisions"]["fallback" if helped else "fallback_unhelpful"] += 1
+        render_policy.record(url, rendered=helped)
+        return page_data, links
+
+    def follow_redirect(self, source_key: str, url: str, location: str) -> str:
+        """Next URL of a redirect chain that started at the page source_key, recorded in the redirect map."""
+        target = self.clean_url(urljoin(url, location))
+        self.stats["redirects"]["hops_followed"] += 1
+        target_key = self.normalize_url(target)
+        if target == url or target_key == source_key and self.normalize_url(url) != source_key:
+            raise Exception(f"Redirect loop at {url}")
+        logger.info(f"Redirect {url} -> {target}")
+        if target_key == self.normalize_url(url):
+            # Only the form of the URL changed (trailing slash, index page): still the same page
+            return target
+
+        if source_key not in self.redirects:
+            self.stats["redirects"]["redirected_pages"] += 1
+        self.redirects[source_key] = target_key
+
+        if not self.is_same_domain(target):
+            raise SkippedResponse("redirect_off_site", f"Redirects off-site to {target}")
+        if target_key in self.processed_urls:
+            raise SkippedResponse("redirect_to_crawled", f"Redirects to already crawled {target}")
+        # The target is crawled here, under its own URL; links to it are not queued again
+        self.processed_urls.add(target_key)
+        self.url_queue.remember(target)
+        return target
+
+    def apply_canonical(self, page_data: Dict, page_key: str) -> Optional[Dict]:
+        """Move a page to its same-site rel=canonical URL. None if that page was already crawled."""
+        canonical = page_data.pop("canonical_url", None)
+        if not canonical or not settings.URL_RESPECT_CANONICAL:
+            return page_data
+        canonical = self.clean_url(urljoin(page_data["url"], canonical))
+        canonical_key = self.normalize_url(canonical)
+        if canonical_key == self.normalize_url(page_data["url"]) or not self.is_same_domain(canonical):
+            return page_data
+
+        self.redirects[page_key] = canonical_key
+        if canonical_key in self.processed_urls:
+            logger.info(f"{page_data['url']} is a duplicate of already crawled {canonical}")
+            self.stats["skipped_responses"]["canonical_duplicate"] += 1
+            return None
+        self.processed_urls.add(canonical_key)
+        self.url_queue.remember(canonical)
+        self.stats["canonical_pages"] += 1
+        return {**page_data, "url": canonical, "canonical_from": page_data["url"]}
+
+    def unchanged_page(self, url: str, previous: Dict, etag: Optional[str], last_modified: Optional[str],
+                       source_url: Optional[str] = None) -> Dict:
+        """Placeholder for a page whose previous result is carried forward instead of re-extracted.
+
+        A previous result saved under another (rel=canonical) URL is carried forward to that URL again.
+        """
+        page = {
+            "url": url,
+            "unchanged": True,
+            "previous_result_id": previous["id"],
+            "parse_method": "unchanged",
+            "etag": etag or previous["etag"],
+            "last_modified": last_modified or previous["last_modified"],
+            "content_hash": previous["content_hash"],
+            "links": previous["links"]
+        }
+        if source_url and source_url != url:
+            page["redirected_from"] = source_url
+        if previous.get("page_url") and self.normalize_url(previous["page_url"]) != self.normalize_url(url):
+            page["canonical_url"] = previous["page_url"]
+        return page
 
     # async def extract_content_basic(self, soup: BeautifulSoup, url: str) -> Dict:
     #     """Extract content using basic HTML parsing."""
@@ -615,248 +1906,125 @@ class Crawler:
 
     #     return result
     
-    async def extract_content_basic(self, soup: BeautifulSoup, url: str) -> Dict:
-        # Get basic metadata
-        title = None
-        if soup.title and soup.title.string:
-            title = soup.title.string.strip()
-        
-        meta_desc = soup.find("meta", {"name": "description"})
-        meta_description = meta_desc.get("content") if meta_desc else None
-        logger.info(f"Title in extract_content_basic in crawler.py: {title}")
-        logger.info(f"Meta description in extract_content_basic in crawler.py: {meta_description}")
-        
-        # Get the main content using trafilatura
-        try:
-            main_content = trafilatura.extract(str(soup)) or ""
-            logger.info(f"Main content in extract_content_basic in crawler.py: {main_content}")
-            # Get the main content element that trafilatura identified
-            main_element = trafilatura.extract(str(soup), output_format='element')
-            if main_element:
-                # Convert the lxml element to BeautifulSoup
-                main_soup = BeautifulSoup(main_element, 'html.parser')
-                logger.info(f"Main soup in extract_content_basic in crawler.py: {main_soup}")
-            else:
-                main_soup = soup  # Fallback to original soup
-        except Exception as e:
-            print(f"Error extracting main content: {e}")
-            main_content = ""
-            main_soup = soup
+    async def extract_content_basic(self, html, url: str, encoding: Optional[str] = None) -> Dict:
+        """Extract content in the extraction process pool so the event loop stays free."""
+        page_data = await extraction_pool.run(extract_page, html, url, encoding)
+        self.stats["html_parse_seconds"] += page_data["parse_time_seconds"]
+        return page_data
 
-        # Now we need to map the trafilatura content to the original structure
-        structured_content = []
-        seen_content = set()
-        
-        if title:
-            structured_content.append({
-                'type': 'title',
-                'content': title,
-                'tag': 'title'
-            })
-            seen_content.add(title)
-    
-        if meta_description:
-            structured_content.append({
-                'type': 'meta',
-                'content': meta_description,
-                'tag': 'meta'
-            })
-            seen_content.add(meta_description)
+    async def extract_content_playwright(self, url: str, redirect_keys: Optional[List[str]] = None) -> Dict:
+        """Extract content using Playwright for JavaScript-rendered pages.
 
-        def process_element(element):
-            if isinstance(element, (str, NavigableString)) or isinstance(element, Comment):
-                return
+        The render holds one of the host's request slots, like a plain fetch. With redirect_keys
+        (a direct render, without a plain fetch first), a redirect the browser followed is claimed
+        as in fetch_and_extract, and the page is extracted under its target.
+        """
+        host = urlparse(url).netloc
+        async with browser_pool.page() as page:
+            async with host_concurrency.slot(host) as outcome:
+                await host_rate_limiter.acquire(host)
+                render_start = time.perf_counter()
+                wait_until = "load" if settings.PLAYWRIGHT_WAIT_POLICY == "load" else "domcontentloaded"
+                try:
+                    response = await page.goto(url, timeout=settings.PLAYWRIGHT_TIMEOUT, wait_until=wait_until)
+                except PlaywrightError:
+                    outcome.failed = True
+                    raise
+                navigation_seconds = time.perf_counter() - render_start
+                # None for same-document navigations, which have no response
+                status_code = response.status if response is not None else None
+                retry_after = response.headers.get("retry-after") if response is not None else None
+                if status_code is not None:
+                    outcome.record_status(status_code, retry_after, navigation_seconds)
+                if status_code not in RETRY_STATUSES:
+                    await self.wait_for_render(page)
+                    content = await page.content()
+                final_url = self.clean_url(page.url)
+            render_seconds = time.perf_counter() - render_start
 
-            # Skip unwanted elements
-            if element.name in ['script', 'style', 'nav', 'footer', 'iframe', 'form', 'button', 'input']:
-                return
+        # Raised outside the pooled page, which is fine and goes back to the pool
+        if status_code in RETRY_STATUSES:
+            raise RetryableResponse(status_code, parse_retry_after(retry_after))
+        if redirect_keys is not None and final_url != url:
+            url = self.follow_redirect(self.normalize_url(url), url, final_url)
+            redirect_keys.append(self.normalize_url(url))
 
-            # Get the text content
-            text = self.clean_text(element.get_text())
-            if not text or text in seen_content:
-                return
-            
-            # Handle lists separately since they need special processing
-            if element.name in ['ul', 'ol']:
-                list_items = []
-                for li in element.find_all('li', recursive=False):
-                    li_text = self.clean_text(li.get_text())
-                    if li_text and li_text not in seen_content:
-                        list_items.append(li_text)
-                        seen_content.add(li_text)
-                
-                if list_items:
-                    list_title = None
-                    # Look for a title in previous siblings
-                    for prev in element.find_previous_siblings(['p', 'h1', 'h2', 'h3', 'h4']):
-                        title_text = self.clean_text(prev.get_text())
-                        if title_text and title_text not in seen_content:
-                            list_title = title_text
-                            seen_content.add(title_text)
-                            break
-                    
-                    structured_content.append({
-                        'type': 'list',
-                        'title': list_title,
-                        'items': list_items,
-                        'tag': element.name
-                    })
-                return  # Skip processing children for lists
-
-            # Check if this text exists in the trafilatura content
-            if text in main_content:
-                if element.name == 'h1':
-                    structured_content.append({
-                        'type': 'heading',
-                        'level': 1,
-                        'content': text,
-                        'tag': 'h1'
-                    })
-                    seen_content.add(text)
-                elif element.name == 'h2':
-                    structured_content.append({
-                        'type': 'heading',
-                        'level': 2,
-                        'content': text,
-                        'tag': 'h2'
-                    })
-                    seen_content.add(text)
-                elif element.name in ['h3', 'h4']:
-                    structured_content.append({
-                        'type': 'heading',
-                        'level': 3,
-                        'content': text,
-                        'tag': 'h3'
-                    })
-                    seen_content.add(text)
-                elif element.name == 'p':
-                    text = self.clean_text(element.get_text())
-                    if text and text not in seen_content:  # Remove the main_content check
-                        structured_content.append({
-                            'type': 'paragraph',
-                            'content': text,
-                            'tag': 'p'
-                        })
-                        seen_content.add(text)
-
-            # Process children
-            for child in element.children:
-                process_element(child)
-                
-        # First, try to find h1 in the original soup 
-        h1_element = soup.find('h1')
-        if h1_element:
-            h1_text = self.clean_text(h1_element.get_text())
-            if h1_text and h1_text not in seen_content:
-                structured_content.append({
-                    'type': 'heading',
-                    'level': 1,
-                    'content': h1_text,
-                    'tag': 'h1'
-                })
-                seen_content.add(h1_text)
-
-        # Process the original soup to maintain structure
-        if soup.body:
-            process_element(soup.body)
-        # Create full_text with structure
-        full_text_parts = []
-        h1_text = None
-        h2_tags = []
-        h3_tags = []
-        
-        for item in structured_content:
-            if item['type'] == 'title':
-                full_text_parts.append(f"[TITLE_START]\n{item['content']}\n[TITLE_END]")
-            elif item['type'] == 'meta':
-                full_text_parts.append(f"[META_START]\n{item['content']}\n[META_END]")
-            elif item['type'] == 'heading':
-                if item['level'] == 1:
-                    h1_text = item['content']
-                    full_text_parts.append(f"[H1_START]\n{item['content']}\n[H1_END]")
-                elif item['level'] == 2:
-                    h2_tags.append(item['content'])
-                    full_text_parts.append(f"[H2_START]\n{item['content']}\n[H2_END]")
-                elif item['level'] == 3:
-                    h3_tags.append(item['content'])
-                    full_text_parts.append(f"[H3_START]\n{item['content']}\n[H3_END]")
-            elif item['type'] == 'paragraph':
-                full_text_parts.append(f"[P_START]\n{item['content']}\n[P_END]")
-            elif item['type'] == 'list':
-                # Only add the title if it exists and hasn't been added before
-                if item.get('title') and item['title'] not in seen_content:
-                    full_text_parts.append(f"[P_START]\n{item['title']}\n[P_END]")
-                    seen_content.add(item['title'])
-                # Add the list items
-                list_text = "\n".join(f"• {list_item}" for list_item in item['items'])
-                full_text_parts.append(f"[LIST_START]\n{list_text}\n[LIST_END]")
-
-
-        full_text = "\n\n".join(full_text_parts)
-        body_text = main_content  # Use trafilatura's output for body_text
-
-        # Calculate word count
-        word_count = sum(len(item.get('content', '').split()) for item in structured_content)
-        word_count += sum(len(item.get('items', [])) for item in structured_content if item['type'] == 'list')
-
-        result = {
+        if self.archive is not None:
+            await self.archive_page(self.archive.write_rendered, url, content)
+        page_data = await self.extract_content_basic(content, url)
+        page_data["parse_method"] = "playwright"
+        page_data["render_time_seconds"] = round(render_seconds, 4)
+
+        self.stats["render_seconds"] += render_seconds
+        self.stats["render_timings"].append({
             "url": url,
-            "title": title,
-            "meta_description": meta_description,
-            "h1": h1_text,
-            "h2": h2_tags,
-            "h3": h3_tags,
-            "body_text": body_text,
-            "full_text": full_text,
-            "word_count": word_count,
-            "parse_method": "basic",
-            "status": "partial" if word_count < settings.MIN_WORD_COUNT else "success"
-        }
-        logger.info(f"Result in extract_content_basic in crawler.py: {result}")
+            "navigation_seconds": round(navigation_seconds, 4),
+            "wait_seconds": round(render_seconds - navigation_seconds, 4),
+            "total_seconds": round(render_seconds, 4)
+        })
         
-        return result
-    
-    async def extract_content_playwright(self, url: str) -> Dict:
-        """Extract content using Playwright for JavaScript-rendered pages."""
-        page = await self.browser.new_page()
+        return page_data
+
+    async def archive_page(self, write, *args) -> None:
+        """Append a record to the batch archive off the event loop; a failed write never fails the page."""
         try:
-            await page.goto(url, timeout=settings.PLAYWRIGHT_TIMEOUT)
-            content = await page.content()
-            
-            soup = BeautifulSoup(content, 'html.parser')
-            page_data = await self.extract_content_basic(soup, url)
-            page_data["parse_method"] = "playwright"
-            
-            return page_data
-        finally:
-            await page.close()
+            await asyncio.get_running_loop().run_in_executor(None, write, *args)
+            self.stats["archived_records"] += 1
+        except OSError as e:
+            logger.error(f"Could not archive {args[0]}: {str(e)}")
+
+    async def wait_for_render(self, page) -> None:
+        """Give client-side rendering a bounded amount of extra time after DOMContentLoaded."""
+        policy = settings.PLAYWRIGHT_WAIT_POLICY
+        try:
+            if policy == "networkidle":
+                await page.wait_for_load_state("networkidle", timeout=settings.PLAYWRIGHT_NETWORK_IDLE_TIMEOUT)
+            elif policy == "selector":
+                await page.wait_for_selector(settings.PLAYWRIGHT_WAIT_SELECTOR, timeout=settings.PLAYWRIGHT_TIMEOUT)
+        except PlaywrightTimeoutError:
+            # The wait is only a hint; extract whatever has rendered so far
+            logger.info(f"Render wait ({policy}) timed out for {page.url}, using current DOM")
 
     def needs_playwright(self, page_data: Dict) -> bool:
         """Check if we need to try Playwright for better extraction."""
-        return (
-            not page_data.get("title") or
-            not page_data.get("h1") or
-            (page_data.get("word_count", 0) < settings.MIN_WORD_COUNT)
-        )
+        return is_thin(page_data)
 
-    async def extract_and_queue_urls(self, soup: BeautifulSoup, base_url: str) -> None:
-        """Extract and queue new URLs from the page."""
-        for a in soup.find_all("a", href=True):
-            href = a["href"]
-            full_url = urljoin(base_url, href)
-            current_url = self.normalize_url(full_url)
-            
-            # Skip PDFs
-            if current_url.lower().endswith('.pdf'):
+    async def extract_and_queue_urls(self, links: List[str], base_url: str, depth: int = 1) -> None:
+        """Queue new URLs from the hrefs found on the page; they are depth links from the start."""
+        if self.max_depth is not None and depth > self.max_depth:
+            return
+        for url, key in self.resolve_links(links, base_url):
+            # A known redirect: its target is already crawled or off-site
+            if key in self.redirects:
+                self.stats["redirects"]["resolved_from_map"] += 1
                 continue
-            
-            if (
-                self.is_same_domain(current_url) and
-                current_url not in self.processed_urls and
-                current_url not in self.visited_urls and
-                self.is_allowed(current_url)
-            ):
-                self.url_queue.append(current_url)
+            # Already queued once (or crawled) is a no-op
+            self.url_queue.add(url, self.score(url, depth, key=key), depth, key=key)
+
+    def resolve_links(self, links: List[str], base_url: str) -> List[Tuple[str, str]]:
+        """(url, key) of every distinct same-site page among the hrefs of a page that robots.txt allows.
+
+        Pages repeat their navigation, so hrefs are deduplicated before they are resolved, and each
+        URL is split once for the domain, file type, robots.txt and canonical key checks.
+        """
+        canonicalizer = self.canonicalizer
+        robots_rules = self.robots_rules if settings.RESPECT_ROBOTS_TXT else None
+        resolved: Dict[str, str] = {}
+        for href in dict.fromkeys(links):
+            href = href.strip()
+            if not href or href.startswith(IGNORED_HREF_PREFIXES):
+                continue
+            parts = canonicalizer.split(urljoin(base_url, href))
+            if parts.netloc != self.domain or parts.path.lower().endswith(SKIPPED_EXTENSIONS):
+                continue
+            key = canonicalizer.canonicalize_split(parts)
+            if key in resolved:
+                continue
+            path = f"{parts.path}?{parts.query}" if parts.query else parts.path
+            if robots_rules is not None and not robots_rules.is_path_allowed(path):
+                continue
+            resolved[key] = urlunsplit(parts)
+        return [(url, key) for key, url in resolved.items()]
 
     def is_same_domain(self, url: str) -> bool:
         """Check if URL is from the same domain."""
@@ -864,19 +2032,17 @@ class Crawler:
 
     def is_allowed(self, url: str) -> bool:
         """Check if URL is allowed by robots.txt."""
-        if self.robots_parser is None:
-            logger.info(f"No robots.txt restrictions, allowing URL: {url}")
+        if self.robots_rules is None:
             return True
-        
-        is_allowed = self.robots_parser.can_fetch(settings.USER_AGENT, url)
-        logger.info(f"Robots.txt check for {url}: {'allowed' if is_allowed else 'not allowed'}")
-        
-        # If robots.txt exists but blocks everything, we'll proceed anyway
-        if not is_allowed:
-            logger.warning(f"URL {url} is blocked by robots.txt, but proceeding anyway")
+
+        if self.robots_rules.is_allowed(url):
             return True
-            
-        return True
+
+        # Blocked URLs are still crawled unless robots.txt is enforced
+        if not settings.RESPECT_ROBOTS_TXT:
+            logger.debug(f"URL {url} is blocked by robots.txt, but proceeding anyway")
+            return True
+        return False
     
     # def is_allowed(self, url: str) -> bool:
     #     """Check if URL is allowed by robots.txt."""
@@ -1,6 +1,9 @@
 from fastapi import FastAPI
 from routes import router 
 from fastapi.middleware.cors import CORSMiddleware
+from services.extraction_pool import extraction_pool
+from services.browser_pool import browser_pool
+from services.http_client import http_client_manager
 import sentry_sdk
 
 sentry_sdk.init(
@@ -27,6 +30,12 @@ app.add_middleware(
 
 app.include_router(router)  # Add this line to include your routes
 
+@app.on_event("shutdown")
+async def shutdown_crawler_services():
+    extraction_pool.shutdown()
+    await browser_pool.close()
+    await http_client_manager.close()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
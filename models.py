@@ -77,9 +77,12 @@ class GSCKeywordData(Base):
     batch_id = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=func.now())
     last_updated = Column(DateTime, default=func.now(), onupdate=func.now())
+    # services.canonical_url.url_match_key(page_url), to find the keywords of crawled pages in SQL
+    canonical_page_url = Column(Text, nullable=True)
     
     __table_args__ = (
         UniqueConstraint('keyword', 'page_url', 'date', 'website_id', 'batch_id', name='unique_keyword_data'),
+        Index('idx_gsc_keyword_data_batch_canonical_url', 'batch_id', 'canonical_page_url'),
     )
 
 class CrawlerResult(Base):
@@ -101,8 +104,28 @@ class CrawlerResult(Base):
     status = Column(String(50))
     batch_id = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Validators for incremental recrawls
+    etag = Column(Text, nullable=True)
+    last_modified = Column(Text, nullable=True)
+    content_hash = Column(String(64), nullable=True)  # sha256 of the fetched HTML
+    links = Column(JSONB, nullable=True)  # hrefs found on the page, reused when it is unchanged
+    fetched_url = Column(Text, nullable=True)  # URL the page was fetched from when saved under its rel=canonical URL
+
+    __table_args__ = (
+        Index('idx_crawler_results_website_url', 'website_id', 'page_url'),
+    )
     
     
+class CrawlCheckpoint(Base):
+    __tablename__ = 'crawl_checkpoints'
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String(64), nullable=False, unique=True)
+    batch_id = Column(String(255), nullable=False, index=True)
+    state = Column(JSONB, nullable=False)  # session details plus Crawler.checkpoint()
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class PageOptimization(Base):
     __tablename__ = 'page_optimizations'
     
@@ -0,0 +1,130 @@
+"""Re-extract a crawled batch from its HTML archive (HTML_ARCHIVE), without touching the network.
+
+Every archived page goes through the current extraction code again, in
+parallel over all cores, and the CrawlerResult rows of the batch are updated
+in bulk. Pages Playwright rendered are re-extracted from the DOM archived at
+crawl time. Pages carried forward on a 304 were never downloaded, so they
+have no record and keep their rows.
+
+    python reextract.py <batch_id> [--workers N]
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from config import settings
+from crawler import extract_page
+from database import SessionLocal
+from models import CrawlerResult
+from services.canonical_url import canonicalizer_for
+from services.html_archive import HtmlArchive, archive_path
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Columns that come from extraction; validators (etag, content_hash, ...) describe the fetch and stay
+UPDATED_FIELDS = ('title', 'meta_description', 'h1', 'h2', 'h3', 'body_text', 'full_text', 'word_count',
+                  'status', 'links')
+UPDATE_CHUNK_SIZE = 500
+
+
+def extract_archive(archive: HtmlArchive, workers: int) -> Dict[str, Dict]:
+    """Extracted page of every URL in the archive; of several records for a URL, the last one written wins."""
+    pages: Dict[str, Tuple[int, Dict]] = {}
+    pending: Dict[Future, Tuple[int, str]] = {}
+
+    def collect(done) -> None:
+        for future in done:
+            order, url = pending.pop(future)
+            try:
+                page_data = future.result()
+            except Exception as e:
+                logger.error(f"Error extracting {url}: {str(e)}")
+                continue
+            if url not in pages or pages[url][0] < order:
+                pages[url] = (order, page_data)
+
+    # spawn, not fork, as in services.extraction_pool
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        for order, record in enumerate(archive):
+            # A few tasks per worker in flight, so the archive is never loaded into memory whole
+            if len(pending) >= workers * 4:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                collect(done)
+            future = executor.submit(extract_page, record.body, record.url, record.encoding)
+            pending[future] = (order, record.url)
+        collect(wait(list(pending)).done)
+    return {url: page_data for url, (_, page_data) in pages.items()}
+
+
+def canonical_url(url: str, page_data: Dict) -> Optional[str]:
+    """Same-site rel=canonical URL the crawler saved the page under instead of url, if any (Crawler.apply_canonical)."""
+    canonical = page_data.get("canonical_url")
+    if not canonical or not settings.URL_RESPECT_CANONICAL:
+        return None
+    canonical = canonicalizer_for(urlparse(url).hostname).clean(urljoin(url, canonical))
+    return canonical if urlparse(canonical).netloc == urlparse(url).netloc else None
+
+
+def update_results(batch_id: str, pages: Dict[str, Dict]) -> int:
+    """Write re-extracted pages over the rows of batch_id, in chunks. Returns the number of rows updated."""
+    db = SessionLocal()
+    try:
+        ids_by_url: Dict[str, List[int]] = {}
+        for row in db.query(CrawlerResult.id, CrawlerResult.page_url).filter(CrawlerResult.batch_id == batch_id):
+            ids_by_url.setdefault(row.page_url, []).append(row.id)
+
+        updates: Dict[int, Dict] = {}
+        for url, page_data in pages.items():
+            for result_id in ids_by_url.get(url, []):
+                updates[result_id] = page_data
+        # A page saved under its rel=canonical URL, unless that URL was archived itself
+        for url, page_data in pages.items():
+            for result_id in ids_by_url.get(canonical_url(url, page_data), []):
+                updates.setdefault(result_id, page_data)
+
+        mappings = [
+            {"id": result_id, **{field: page_data.get(field) for field in UPDATED_FIELDS}}
+            for result_id, page_data in updates.items()
+        ]
+        for start in range(0, len(mappings), UPDATE_CHUNK_SIZE):
+            db.bulk_update_mappings(CrawlerResult, mappings[start:start + UPDATE_CHUNK_SIZE])
+            db.commit()
+        return len(mappings)
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-extract a crawled batch from its HTML archive.")
+    parser.add_argument("batch_id")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="extraction processes")
+    args = parser.parse_args()
+
+    path = archive_path(args.batch_id)
+    if not os.path.exists(path):
+        logger.error(f"No archive for batch {args.batch_id} at {path}; was it crawled with HTML_ARCHIVE on?")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    pages = extract_archive(HtmlArchive(path), args.workers)
+    extracted = time.perf_counter()
+    logger.info(f"Re-extracted {len(pages)} pages of batch {args.batch_id} with {args.workers} workers "
+                f"in {extracted - start:.1f}s")
+    updated = update_results(args.batch_id, pages)
+    logger.info(f"Updated {updated} results of batch {args.batch_id} in {time.perf_counter() - extracted:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
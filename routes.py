@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import List
 from datetime import datetime, date
 import uuid
@@ -16,6 +15,10 @@ from schemas import (
     OptimizationCreate, OptimizationResponse, LatestOptimization, OptimizedPage, OptimizationsList, OptimizationDetail
 )
 from crawler import Crawler
+from services.crawl_history import load_page_impressions, load_previous_pages, save_crawl_page
+from services.checkpoints import checkpoint_store
+from services.crawl_queue import ProgressListener, publish_crawl_job, publish_stop
+from services.canonical_url import url_match_key
 from fastapi import HTTPException
 from pydantic import HttpUrl
 from typing import List, Optional, Dict
@@ -74,6 +77,10 @@ class CrawlRequest(BaseModel):
     batch_id: str
     user_id: int  
     website_id: int
+    sitemap_only: bool = False  # crawl only the URLs listed in the site's sitemaps
+    max_depth: Optional[int] = None  # links followed away from the start page
+    max_pages: Optional[int] = None  # pages fetched before the crawl stops
+    deadline_seconds: Optional[int] = None  # wall-clock seconds before the crawl stops
 
 class PageData(BaseModel):
     url: str
@@ -113,6 +120,7 @@ class CrawlStatus(BaseModel):
     pages_found: int = 0
     pages_crawled: int = 0
     current_url: Optional[str] = None
+    host_limit: Optional[Dict] = None  # adaptive concurrency of the crawled host (services.host_concurrency)
     pages: Optional[List[PageData]] = None
     
 class CrawlSelectedRequest(BaseModel):
@@ -127,6 +135,29 @@ class PageSummary(BaseModel):
     position: float
     
 crawl_sessions = {}
+
+
+def apply_worker_progress(message: Dict) -> None:
+    """Mirror progress published by crawl workers into crawl_sessions (CRAWL_EXECUTION=queue)."""
+    session_id = message.pop("session_id")
+    session = crawl_sessions.setdefault(session_id, {
+        "status": "starting",
+        "pages_found": 0,
+        "pages_crawled": 0,
+        "current_url": None,
+        "pages": []
+    })
+    page = message.pop("page", None)
+    if page:
+        session.setdefault("pages", []).append(page)
+    # Updates already in flight must not undo a stop requested through this API
+    if session.get("status") == "stopped" and message.get("status") in ("starting", "in_progress"):
+        message.pop("status")
+    session.update(message)
+
+
+if settings.CRAWL_EXECUTION == "queue":
+    crawl_progress_listener = ProgressListener(apply_worker_progress).start()
 ai_service = AIService()
 
 @router.get("/user/email/{db_user_id}")
@@ -158,17 +189,39 @@ async def crawl_website(request: CrawlRequest, background_tasks: BackgroundTasks
             "user_id": request.user_id,
             "current_url": None
         }
+
+        if settings.CRAWL_EXECUTION == "queue":
+            # A crawl worker runs it and reports progress back through RabbitMQ
+            publish_crawl_job({
+                "session_id": session_id,
+                "base_url": str(request.base_url),
+                "batch_id": request.batch_id,
+                "website_id": request.website_id,
+                "user_id": request.user_id,
+                "selected_urls": None,
+                "sitemap_only": request.sitemap_only,
+                "max_depth": request.max_depth,
+                "max_pages": request.max_pages,
+                "deadline_seconds": request.deadline_seconds
+            })
+            return {"session_id": session_id, "pages": [], "statistics": {}}
         
         # Create and start the crawler
         logger.info(f"Creating crawler for {request.base_url} with batch_id {request.batch_id}")
-        crawler = Crawler(str(request.base_url), request.batch_id)
+        previous_pages = load_previous_pages(db, request.website_id, request.user_id, request.batch_id)
+        page_impressions = load_page_impressions(db, request.website_id, request.user_id)
+        crawler = Crawler(str(request.base_url), request.batch_id, previous_pages=previous_pages,
+                          sitemap_only=request.sitemap_only, page_impressions=page_impressions,
+                          max_depth=request.max_depth, max_pages=request.max_pages,
+                          deadline_seconds=request.deadline_seconds)
         
         def update_progress(total_pages, crawled_pages, current_url):
             crawl_sessions[session_id].update({
                 "status": "in_progress",
                 "pages_found": total_pages,
                 "pages_crawled": crawled_pages,
-                "current_url": current_url
+                "current_url": current_url,
+                "host_limit": crawler.host_limit()
             })
         
         crawler.set_progress_callback(update_progress)
@@ -234,17 +287,33 @@ async def crawl_selected_urls(request: CrawlSelectedRequest, background_tasks: B
         from urllib.parse import urlparse
         parsed = urlparse(request.urls[0] if request.urls else "")
         base_domain = f"{parsed.scheme}://{parsed.netloc}"
+
+        if settings.CRAWL_EXECUTION == "queue":
+            publish_crawl_job({
+                "session_id": session_id,
+                "base_url": base_domain,
+                "batch_id": request.batch_id,
+                "website_id": request.website_id,
+                "user_id": request.user_id,
+                "selected_urls": request.urls,
+                "sitemap_only": False
+            })
+            return {"session_id": session_id, "pages": [], "statistics": {}}
         
         # Create the crawler with the selected URLs
         logger.info(f"Creating crawler for selected URLs with base domain {base_domain}")
-        crawler = Crawler(base_domain, request.batch_id, selected_urls=request.urls)
+        previous_pages = load_previous_pages(db, request.website_id, request.user_id, request.batch_id)
+        page_impressions = load_page_impressions(db, request.website_id, request.user_id)
+        crawler = Crawler(base_domain, request.batch_id, selected_urls=request.urls, previous_pages=previous_pages,
+                          page_impressions=page_impressions)
         
         def update_progress(total_pages, crawled_pages, current_url):
             crawl_sessions[session_id].update({
                 "status": "in_progress",
                 "pages_found": total_pages,
                 "pages_crawled": crawled_pages,
-                "current_url": current_url
+                "current_url": current_url,
+                "host_limit": crawler.host_limit()
             })
         
         crawler.set_progress_callback(update_progress)
@@ -295,7 +364,9 @@ async def run_crawl_selected_task(crawler: Crawler, session_id: str, db: Session
         logger.info("Initializing crawler...")
 
         saved_pages = []
-        pages_crawled = 0
+        # Non-zero when resuming from a checkpoint
+        pages_crawled = crawler.pages_crawled
+        last_checkpoint = 0.0
 
         # Use crawler.crawl() just like in run_crawl_task
         async for page in crawler.crawl():
@@ -304,34 +375,9 @@ async def run_crawl_selected_task(crawler: Crawler, session_id: str, db: Session
                 break
             
             logger.info(f"Saving page: {page['url']}")
-            existing_page = db.query(CrawlerResult).filter(
-                    CrawlerResult.page_url == page['url'],
-                    CrawlerResult.word_count == page['word_count'],
-            CrawlerResult.batch_id == batch_id,
-            CrawlerResult.website_id == website_id,
-            CrawlerResult.user_id == user_id
-                ).first()
-                
-            if not existing_page:
-                new_page = CrawlerResult(
-                    page_url=page['url'],
-                    title=page['title'],
-                    meta_description=page['meta_description'],
-                    h1=page['h1'],
-                    h2=page['h2'],
-                    h3=page['h3'],
-                    body_text=page['body_text'],
-                    word_count=page['word_count'],
-                    status=page['status'],
-                    batch_id=batch_id,
-                website_id=website_id,
-                user_id=user_id,
-                    full_text=page['full_text']
-                )
-                logger.info(f"About to save page: {new_page.page_url}")
-                db.add(new_page)
-                saved_pages.append(page)
-                db.commit()
+            saved = save_crawl_page(db, page, batch_id, website_id, user_id)
+            if saved:
+                saved_pages.append(saved)
                 pages_crawled += 1
 
             # Update session status after each page
@@ -343,6 +389,17 @@ async def run_crawl_selected_task(crawler: Crawler, session_id: str, db: Session
                 "pages": saved_pages
             })
 
+            # Pages so far are saved, so the crawl can be resumed from here after a restart
+            if time.monotonic() - last_checkpoint >= settings.CRAWL_CHECKPOINT_INTERVAL:
+                save_crawl_checkpoint(crawler, session_id)
+                last_checkpoint = time.monotonic()
+
+        # A stopped crawl can be resumed later, a finished one needs no checkpoint
+        if crawl_sessions[session_id].get("status") == "stopped":
+            save_crawl_checkpoint(crawler, session_id)
+        else:
+            checkpoint_store.delete(session_id)
+
         # Finalize
         crawl_sessions[session_id].update({
             "status": "completed",
@@ -479,7 +536,9 @@ async def run_crawl_task(crawler: Crawler, session_id: str, db: Session, batch_i
         logger.info("Initializing crawler...")
 
         saved_pages = []
-        pages_crawled = 0
+        # Non-zero when resuming from a checkpoint
+        pages_crawled = crawler.pages_crawled
+        last_checkpoint = 0.0
 
         async for page in crawler.crawl():
             
@@ -488,34 +547,9 @@ async def run_crawl_task(crawler: Crawler, session_id: str, db: Session, batch_i
                 break
             
             logger.info(f"Saving page: {page['url']}")
-            existing_page = db.query(CrawlerResult).filter(
-                CrawlerResult.page_url == page['url'],
-                CrawlerResult.word_count == page['word_count'],
-                CrawlerResult.batch_id == batch_id,
-                CrawlerResult.website_id == website_id,
-                CrawlerResult.user_id == user_id
-                ).first()
-                
-            if not existing_page:
-                new_page = CrawlerResult(
-                    page_url=page['url'],
-                    title=page['title'],
-                    meta_description=page['meta_description'],
-                    h1=page['h1'],
-                    h2=page['h2'],
-                    h3=page['h3'],
-                    body_text=page['body_text'],
-                    word_count=page['word_count'],
-                    status=page['status'],
-                    batch_id=batch_id,
-                    website_id=website_id,
-                    user_id=user_id,
-                    full_text=page['full_text']
-                )
-                logger.info(f"About to save page: {new_page.page_url}")
-                db.add(new_page)
-                saved_pages.append(page)
-                db.commit()
+            saved = save_crawl_page(db, page, batch_id, website_id, user_id)
+            if saved:
+                saved_pages.append(saved)
                 pages_crawled += 1
 
             # Update session status after each page
@@ -527,6 +561,17 @@ async def run_crawl_task(crawler: Crawler, session_id: str, db: Session, batch_i
                 "pages": saved_pages
             })
 
+            # Pages so far are saved, so the crawl can be resumed from here after a restart
+            if time.monotonic() - last_checkpoint >= settings.CRAWL_CHECKPOINT_INTERVAL:
+                save_crawl_checkpoint(crawler, session_id)
+                last_checkpoint = time.monotonic()
+
+        # A stopped crawl can be resumed later, a finished one needs no checkpoint
+        if crawl_sessions[session_id].get("status") == "stopped":
+            save_crawl_checkpoint(crawler, session_id)
+        else:
+            checkpoint_store.delete(session_id)
+
         # Finalize
         crawl_sessions[session_id].update({
             "status": "completed",
@@ -565,6 +610,7 @@ async def get_crawl_status(session_id: str):
             pages_found=session_data["pages_found"],
             pages_crawled=session_data["pages_crawled"],
             current_url=session_data["current_url"],
+            host_limit=session_data.get("host_limit"),
             pages=session_data.get("pages", None)  # Include pages if they exist
         )
         
@@ -593,6 +639,8 @@ async def stop_crawl(session_id: str):
             "status": "stopped",
             "pages": crawl_sessions[session_id].get("pages", [])
         })
+        if settings.CRAWL_EXECUTION == "queue":
+            publish_stop(session_id)
         
         return {"status": "stopped"}
     except Exception as e:
@@ -600,7 +648,109 @@ async def stop_crawl(session_id: str):
             status_code=500,
             content={"detail": str(e)}
         )
-        
+
+
+def save_crawl_checkpoint(crawler: Crawler, session_id: str) -> None:
+    """Persist the crawl state so /crawl/resume can continue it in another process."""
+    session = crawl_sessions[session_id]
+    try:
+        checkpoint_store.save(session_id, {
+            "batch_id": session["batch_id"],
+            "website_id": session["website_id"],
+            "user_id": session["user_id"],
+            "crawl": crawler.checkpoint()
+        })
+    except Exception as e:
+        logger.error(f"Error saving checkpoint for session {session_id}: {str(e)}")
+
+
+@router.post("/crawl/resume/{session_id}", response_model=CrawlResponse)
+async def resume_crawl(session_id: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """Continue an interrupted or stopped crawl from its last checkpoint."""
+    try:
+        if crawl_sessions.get(session_id, {}).get("status") in ("starting", "in_progress"):
+            return JSONResponse(
+                status_code=409,
+                content={"detail": "Crawl session is still running"}
+            )
+
+        checkpoint = checkpoint_store.load(session_id)
+        if checkpoint is None:
+            return JSONResponse(
+                status_code=404,
+                content={"detail": "No checkpoint found for crawl session"}
+            )
+
+        logger.info(f"Resuming crawl for session {session_id} with batch_id {checkpoint['batch_id']}")
+        if settings.CRAWL_EXECUTION == "queue":
+            # The worker that picks this up continues from the same checkpoint
+            crawl_sessions[session_id] = {
+                "status": "starting",
+                "pages_found": 0,
+                "pages_crawled": len(checkpoint["crawl"]["processed"]),
+                "batch_id": checkpoint["batch_id"],
+                "website_id": checkpoint["website_id"],
+                "user_id": checkpoint["user_id"],
+                "current_url": None
+            }
+            publish_crawl_job({
+                "session_id": session_id,
+                "base_url": checkpoint["crawl"]["base_url"],
+                "batch_id": checkpoint["batch_id"],
+                "website_id": checkpoint["website_id"],
+                "user_id": checkpoint["user_id"],
+                "selected_urls": checkpoint["crawl"]["selected_urls"],
+                "sitemap_only": checkpoint["crawl"]["sitemap_only"]
+            })
+            return {"session_id": session_id, "pages": [], "statistics": {}}
+
+        previous_pages = load_previous_pages(db, checkpoint["website_id"], checkpoint["user_id"], checkpoint["batch_id"])
+        page_impressions = load_page_impressions(db, checkpoint["website_id"], checkpoint["user_id"])
+        crawler = Crawler.from_checkpoint(checkpoint["crawl"], previous_pages=previous_pages,
+                                          page_impressions=page_impressions)
+
+        crawl_sessions[session_id] = {
+            "status": "starting",
+            "pages_found": crawler.pages_found,
+            "pages_crawled": crawler.pages_crawled,
+            "batch_id": checkpoint["batch_id"],
+            "website_id": checkpoint["website_id"],
+            "user_id": checkpoint["user_id"],
+            "current_url": None
+        }
+
+        def update_progress(total_pages, crawled_pages, current_url):
+            crawl_sessions[session_id].update({
+                "status": "in_progress",
+                "pages_found": total_pages,
+                "pages_crawled": crawled_pages,
+                "current_url": current_url,
+                "host_limit": crawler.host_limit()
+            })
+
+        crawler.set_progress_callback(update_progress)
+
+        background_tasks.add_task(
+            run_crawl_selected_task if crawler.only_selected else run_crawl_task,
+            crawler=crawler,
+            session_id=session_id,
+            db=db,
+            batch_id=checkpoint["batch_id"],
+            website_id=checkpoint["website_id"],
+            user_id=checkpoint["user_id"]
+        )
+
+        return {
+            "session_id": session_id,
+            "pages": [],
+            "statistics": {}
+        }
+
+    except Exception as e:
+        logger.error(f"Error in resume_crawl: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # User endpoints
 @router.post("/users/", response_model=UserSchema)
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
@@ -766,7 +916,7 @@ def create_gsc_keyword_data(data: GSCKeywordDataCreate, db: Session = Depends(ge
             setattr(existing, key, value)
     else:
         # Create new record
-        existing = GSCKeywordData(**data.dict())
+        existing = GSCKeywordData(**data.dict(), canonical_page_url=url_match_key(data.page_url))
         db.add(existing)
     db.commit()
     db.refresh(existing)
@@ -896,14 +1046,21 @@ async def get_batch_analysis(batch_id: str,
     logger.info(f"Crawler results: {len(crawler_results)}")
     unique_crawler_urls = set(cr.page_url for cr in crawler_results)
     logger.info(f"Unique crawler urls: {len(unique_crawler_urls)}")
-    
+
+    # GSC and the crawler can report the same page under different URL variants
+    # (trailing slash, index.html, default port, case), so match on the canonical form
+    crawler_url_by_key = {url_match_key(url): url for url in unique_crawler_urls}
+
     # Get GSC data but only for crawled URLs
-    keyword_data = db.query(GSCKeywordData).filter(
-        GSCKeywordData.batch_id == batch_id,
-        func.lower(GSCKeywordData.page_url).in_([url for url in unique_crawler_urls])
-    ).order_by(GSCKeywordData.impressions.desc()).all()
+    keyword_data = [
+        (crawler_url_by_key[keyword.canonical_page_url], keyword)
+        for keyword in db.query(GSCKeywordData).filter(
+            GSCKeywordData.batch_id == batch_id,
+            GSCKeywordData.canonical_page_url.in_(list(crawler_url_by_key))
+        ).order_by(GSCKeywordData.impressions.desc()).all()
+    ]
 
-    urls_with_keywords = set(kw.page_url for kw in keyword_data)
+    urls_with_keywords = set(crawler_url for crawler_url, kw in keyword_data)
     logger.info(f"URLs with GSC keyword data: {len(urls_with_keywords)}")
     logger.info(f"URLs without GSC data: {len(unique_crawler_urls - urls_with_keywords)}")
 
@@ -932,24 +1089,24 @@ async def get_batch_analysis(batch_id: str,
             }
         for url in unique_crawler_urls
     }
-    for keyword in keyword_data:
-        if keyword.page_url in page_analysis:
-            page_analysis[keyword.page_url]['total_impressions'] += keyword.impressions
-            page_analysis[keyword.page_url]['total_keywords'] += 1
+    for page_url, keyword in keyword_data:
+        if page_url in page_analysis:
+            page_analysis[page_url]['total_impressions'] += keyword.impressions
+            page_analysis[page_url]['total_keywords'] += 1
         
         # Check if keyword exists in content
-        if keyword.page_url in page_content:
-            content = page_content[keyword.page_url]
+        if page_url in page_content:
+            content = page_content[page_url]
             
             if keyword.keyword.lower() in content['full_text'].lower():
-                page_analysis[keyword.page_url]['present_keywords'].append({
+                page_analysis[page_url]['present_keywords'].append({
                     'keyword': keyword.keyword,
                     'impressions': keyword.impressions,
                     'clicks': keyword.clicks,
                     'position': keyword.average_position
                 })
             else:
-                page_analysis[keyword.page_url]['missing_keywords'].append({
+                page_analysis[page_url]['missing_keywords'].append({
                     'keyword': keyword.keyword,
                     'impressions': keyword.impressions,
                     'clicks': keyword.clicks,
@@ -0,0 +1,247 @@
+# services/browser_pool.py
+
+import asyncio
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Route
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserHandle:
+    """A launched Chromium and how much it has been used."""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.pages_rendered = 0
+        self.active_pages = 0
+        self.retired = False
+
+
+class PooledPage:
+    """A warm context with a single page, reused across renders."""
+
+    def __init__(self, handle: BrowserHandle, context: BrowserContext, page: Page):
+        self.handle = handle
+        self.context = context
+        self.page = page
+        self.last_used = time.monotonic()
+
+
+class BrowserPool:
+    """Process-wide Playwright browser shared by every crawl.
+
+    Chromium is launched on the first render request, not when a crawl starts.
+    Up to max_pages contexts are kept warm and reused; contexts idle for longer
+    than idle_timeout are closed, and the browser itself is shut down once nothing
+    has used it for idle_timeout. After pages_per_browser renders the browser is
+    retired and replaced to contain Chromium memory leaks.
+    """
+
+    def __init__(self, max_pages: int, idle_timeout: float, pages_per_browser: int):
+        self.max_pages = max_pages
+        self.idle_timeout = idle_timeout
+        self.pages_per_browser = pages_per_browser
+
+        self.playwright = None
+        self.current: Optional[BrowserHandle] = None
+        self.idle_pages: List[PooledPage] = []
+        self.active_pages = 0
+        self.last_used = time.monotonic()
+        self.reaper_task: Optional[asyncio.Task] = None
+
+        # Created on first use so they bind to the server's event loop
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.lock: Optional[asyncio.Lock] = None
+
+        self.stats = {
+            "browsers_launched": 0,
+            "contexts_created": 0,
+            "pages_rendered": 0,
+            "warm_reuses": 0,
+            "requests_blocked": 0,
+        }
+        self.blocked_resource_types = set(settings.PLAYWRIGHT_BLOCKED_RESOURCE_TYPES)
+        self.blocked_domains = tuple(domain.lower() for domain in settings.PLAYWRIGHT_BLOCKED_DOMAINS)
+
+    async def get_browser(self) -> BrowserHandle:
+        async with self.lock:
+            if self.current is not None and not self.current.retired and self.current.browser.is_connected():
+                return self.current
+
+            if self.current is not None:
+                old = self.current
+                self.retire(old)
+                if old.active_pages == 0:
+                    await self.close_browser(old)
+
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+                logger.info("Playwright initialized successfully")
+            browser = await self.playwright.chromium.launch()
+            self.current = BrowserHandle(browser)
+            self.stats["browsers_launched"] += 1
+            logger.info("Browser launched successfully")
+
+            if self.reaper_task is None or self.reaper_task.done():
+                self.reaper_task = asyncio.create_task(self.reap_idle())
+            return self.current
+
+    def retire(self, handle: BrowserHandle) -> None:
+        """Stop handing out pages from handle; it is closed once its last page is released."""
+        handle.retired = True
+        if handle is self.current:
+            self.current = None
+
+    async def close_browser(self, handle: BrowserHandle) -> None:
+        stale = [pooled for pooled in self.idle_pages if pooled.handle is handle]
+        self.idle_pages = [pooled for pooled in self.idle_pages if pooled.handle is not handle]
+        for pooled in stale:
+            await self.close_page(pooled)
+        try:
+            await handle.browser.close()
+            logger.info(f"Browser closed after {handle.pages_rendered} pages")
+        except Exception as e:
+            logger.warning(f"Error closing browser: {str(e)}")
+
+    async def close_page(self, pooled: PooledPage) -> None:
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            logger.debug(f"Error closing browser context: {str(e)}")
+
+    async def acquire(self) -> PooledPage:
+        handle = await self.get_browser()
+        # Count the lease before any await so the browser is not closed under us
+        handle.active_pages += 1
+        self.active_pages += 1
+        try:
+            while self.idle_pages:
+                pooled = self.idle_pages.pop()
+                if pooled.handle is handle and not pooled.page.is_closed():
+                    self.stats["warm_reuses"] += 1
+                    return pooled
+                await self.close_page(pooled)
+
+            context = await handle.browser.new_context(user_agent=settings.USER_AGENT)
+            if self.blocked_resource_types or self.blocked_domains:
+                await context.route("**/*", self.route_request)
+            page = await context.new_page()
+            self.stats["contexts_created"] += 1
+            return PooledPage(handle, context, page)
+        except Exception:
+            handle.active_pages -= 1
+            self.active_pages -= 1
+            raise
+
+    def is_blocked(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.blocked_resource_types:
+            return True
+        host = urlparse(url).hostname or ""
+        return any(host == domain or host.endswith("." + domain) for domain in self.blocked_domains)
+
+    async def route_request(self, route: Route) -> None:
+        """Abort images, media, fonts and trackers; only the DOM is needed for extraction."""
+        request = route.request
+        if self.is_blocked(request.resource_type, request.url):
+            self.stats["requests_blocked"] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def release(self, pooled: PooledPage, healthy: bool) -> None:
+        handle = pooled.handle
+        handle.active_pages -= 1
+        self.active_pages -= 1
+        handle.pages_rendered += 1
+        self.stats["pages_rendered"] += 1
+        pooled.last_used = self.last_used = time.monotonic()
+
+        if handle.pages_rendered >= self.pages_per_browser and not handle.retired:
+            logger.info(f"Recycling browser after {handle.pages_rendered} pages")
+            self.retire(handle)
+
+        if healthy and not handle.retired and handle.browser.is_connected():
+            try:
+                # Do not leak one site's session into the next render
+                await pooled.context.clear_cookies()
+                self.idle_pages.append(pooled)
+                return
+            except Exception as e:
+                logger.debug(f"Dropping browser context that failed to reset: {str(e)}")
+
+        await self.close_page(pooled)
+        if handle.retired and handle.active_pages == 0:
+            await self.close_browser(handle)
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a warm page for one render."""
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_pages)
+            self.lock = asyncio.Lock()
+
+        async with self.slots:
+            pooled = await self.acquire()
+            healthy = False
+            try:
+                yield pooled.page
+                healthy = True
+            finally:
+                await self.release(pooled, healthy)
+
+    async def reap_idle(self) -> None:
+        """Close contexts, and finally the browser, that have not been used for idle_timeout."""
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 2, 1))
+            now = time.monotonic()
+            expired = [pooled for pooled in self.idle_pages if now - pooled.last_used > self.idle_timeout]
+            self.idle_pages = [pooled for pooled in self.idle_pages if pooled not in expired]
+            for pooled in expired:
+                await self.close_page(pooled)
+
+            handle = self.current
+            # Retired browsers may still be finishing renders, so wait for every lease
+            if handle is not None and self.active_pages == 0 and now - self.last_used > self.idle_timeout:
+                logger.info("Browser idle, shutting it down until the next render")
+                async with self.lock:
+                    if handle is self.current and self.active_pages == 0:
+                        self.current = None
+                        await self.close_browser(handle)
+                        await self.playwright.stop()
+                        self.playwright = None
+                        self.reaper_task = None
+                        return
+
+    async def close(self) -> None:
+        if self.reaper_task is not None:
+            self.reaper_task.cancel()
+            self.reaper_task = None
+        for pooled in self.idle_pages:
+            await self.close_page(pooled)
+        self.idle_pages = []
+        if self.current is not None:
+            await self.close_browser(self.current)
+            self.current = None
+        if self.playwright is not None:
+            await self.playwright.stop()
+            self.playwright = None
+
+    def get_metrics(self) -> Dict:
+        return {
+            **self.stats,
+            "browser_running": self.current is not None,
+            "active_pages": self.active_pages,
+            "idle_pages": len(self.idle_pages),
+        }
+
+
+browser_pool = BrowserPool(
+    max_pages=settings.BROWSER_POOL_SIZE,
+    idle_timeout=settings.BROWSER_IDLE_TIMEOUT,
+    pages_per_browser=settings.BROWSER_PAGES_PER_BROWSER,
+)
@@ -0,0 +1,92 @@
+# services/canonical_url.py
+
+import re
+from typing import Dict, Iterable, Optional
+from urllib.parse import SplitResult, parse_qsl, urlencode, urlsplit, urlunsplit
+from config import settings
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# /index.html, /default.aspx, ... serve the same page as their directory
+INDEX_PAGE = re.compile(r'/(?:index|default)\.(?:html?|php|aspx?|jsp)$', re.IGNORECASE)
+
+
+class UrlCanonicalizer:
+    """Maps the variants of a page's URL to one canonical form.
+
+    clean() only drops what never changes the response (fragment, default port,
+    host case, ignored query parameters) and is safe to fetch. canonicalize()
+    additionally folds index pages and trailing slashes and sorts the query; it
+    identifies a page but is not necessarily a URL the site serves.
+
+    Query parameters are dropped unless listed in keep_params, since most are
+    tracking or session noise.
+    """
+
+    def __init__(self, keep_params: Iterable[str] = (), strip_trailing_slash: bool = True,
+                 strip_index_pages: bool = True):
+        self.keep_params = frozenset(keep_params)
+        self.strip_trailing_slash = strip_trailing_slash
+        self.strip_index_pages = strip_index_pages
+
+    def split(self, url: str) -> SplitResult:
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = parts.hostname or ""
+        if ':' in host:
+            host = f"[{host}]"
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        netloc = host if port is None or port == DEFAULT_PORTS.get(scheme) else f"{host}:{port}"
+        query = ""
+        if self.keep_params and parts.query:
+            query = urlencode([
+                (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                if name in self.keep_params
+            ])
+        return SplitResult(scheme, netloc, parts.path or "/", query, "")
+
+    def clean(self, url: str) -> str:
+        return urlunsplit(self.split(url))
+
+    def canonicalize(self, url: str) -> str:
+        return self.canonicalize_split(self.split(url))
+
+    def canonicalize_split(self, parts: SplitResult) -> str:
+        """canonicalize() of a URL already passed through split(), so it is parsed once."""
+        path = parts.path
+        if self.strip_index_pages:
+            path = INDEX_PAGE.sub('/', path)
+        if self.strip_trailing_slash and len(path) > 1:
+            path = path.rstrip('/') or '/'
+        query = parts.query
+        if query:
+            query = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+        return urlunsplit(parts._replace(path=path, query=query))
+
+
+_canonicalizers: Dict[str, UrlCanonicalizer] = {}
+
+
+def canonicalizer_for(host: Optional[str]) -> UrlCanonicalizer:
+    """Canonicalizer configured for a site: URL_KEEP_QUERY_PARAMS of the host plus those under "*"."""
+    host = (host or "").lower()
+    if host not in _canonicalizers:
+        keep_params = settings.URL_KEEP_QUERY_PARAMS
+        _canonicalizers[host] = UrlCanonicalizer(
+            keep_params=list(keep_params.get("*", [])) + list(keep_params.get(host, [])),
+            strip_trailing_slash=settings.URL_STRIP_TRAILING_SLASH,
+            strip_index_pages=settings.URL_STRIP_INDEX_PAGES
+        )
+    return _canonicalizers[host]
+
+
+def canonicalize_url(url: str) -> str:
+    return canonicalizer_for(urlsplit(url.strip()).hostname).canonicalize(url)
+
+
+def url_match_key(url: str) -> str:
+    """Case-insensitive canonical form that GSC URLs and crawled URLs are matched on."""
+    return canonicalize_url(url).lower()
@@ -0,0 +1,176 @@
+# services/checkpoints.py
+
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from database import SessionLocal
+from models import CrawlCheckpoint
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """Where crawl checkpoints survive a worker restart, keyed by session id.
+
+    Checkpoints of crawl_worker.py carry a "status" and are saved at least every
+    CRAWL_CHECKPOINT_INTERVAL while their crawl runs, so the time of the last
+    save is a lease: a "running" checkpoint older than that lost its worker.
+    """
+
+    def save(self, session_id: str, state: Dict) -> None:
+        raise NotImplementedError
+
+    def load(self, session_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def set_status(self, session_id: str, status: str) -> None:
+        """Change the status of a saved checkpoint, if there is one."""
+        raise NotImplementedError
+
+    def claim_expired(self, lease_seconds: float) -> List[Dict]:
+        """Running checkpoints not saved for lease_seconds; the lease of each is renewed, so only one caller gets it."""
+        raise NotImplementedError
+
+
+class DatabaseCheckpointStore(CheckpointStore):
+    """Checkpoints in the crawl_checkpoints table, one row per session."""
+
+    def save(self, session_id: str, state: Dict) -> None:
+        # Own session: the request session of a background crawl task may be mid-transaction
+        db = SessionLocal()
+        try:
+            checkpoint = db.query(CrawlCheckpoint).filter(CrawlCheckpoint.session_id == session_id).first()
+            if checkpoint is None:
+                checkpoint = CrawlCheckpoint(session_id=session_id, batch_id=state["batch_id"])
+                db.add(checkpoint)
+            checkpoint.state = state
+            # Set explicitly: it is the lease, and an unchanged state would not bump it
+            checkpoint.updated_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    def load(self, session_id: str) -> Optional[Dict]:
+        db = SessionLocal()
+        try:
+            checkpoint = db.query(CrawlCheckpoint).filter(CrawlCheckpoint.session_id == session_id).first()
+            return checkpoint.state if checkpoint else None
+        finally:
+            db.close()
+
+    def delete(self, session_id: str) -> None:
+        db = SessionLocal()
+        try:
+            db.query(CrawlCheckpoint).filter(CrawlCheckpoint.session_id == session_id).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def set_status(self, session_id: str, status: str) -> None:
+        db = SessionLocal()
+        try:
+            checkpoint = db.query(CrawlCheckpoint).filter(CrawlCheckpoint.session_id == session_id).first()
+            if checkpoint is not None and checkpoint.state.get("status") != status:
+                checkpoint.state = {**checkpoint.state, "status": status}
+                db.commit()
+        finally:
+            db.close()
+
+    def claim_expired(self, lease_seconds: float) -> List[Dict]:
+        db = SessionLocal()
+        try:
+            expired = db.query(CrawlCheckpoint.id, CrawlCheckpoint.updated_at).filter(
+                CrawlCheckpoint.updated_at < datetime.utcnow() - timedelta(seconds=lease_seconds),
+                CrawlCheckpoint.state['status'].astext == 'running'
+            ).all()
+            claimed = []
+            for checkpoint_id, updated_at in expired:
+                # Compare-and-set on updated_at: of several workers, one takes the crawl over
+                taken = db.query(CrawlCheckpoint).filter(
+                    CrawlCheckpoint.id == checkpoint_id,
+                    CrawlCheckpoint.updated_at == updated_at
+                ).update({CrawlCheckpoint.updated_at: datetime.utcnow()}, synchronize_session=False)
+                db.commit()
+                if taken:
+                    claimed.append(db.query(CrawlCheckpoint.state).filter(CrawlCheckpoint.id == checkpoint_id).scalar())
+            return claimed
+        finally:
+            db.close()
+
+
+class FileCheckpointStore(CheckpointStore):
+    """Gzipped JSON checkpoints in a local directory, one file per session."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, session_id: str) -> str:
+        # Session ids are uuids, but never let one escape the directory
+        return os.path.join(self.directory, f"{os.path.basename(session_id)}.json.gz")
+
+    def save(self, session_id: str, state: Dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(session_id)
+        temp_path = f"{path}.tmp"
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            json.dump(state, f)
+        # Atomic, so a crash while writing leaves the previous checkpoint intact
+        os.replace(temp_path, path)
+
+    def load(self, session_id: str) -> Optional[Dict]:
+        try:
+            with gzip.open(self.path(session_id), 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def delete(self, session_id: str) -> None:
+        try:
+            os.remove(self.path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def set_status(self, session_id: str, status: str) -> None:
+        state = self.load(session_id)
+        if state is not None and state.get("status") != status:
+            self.save(session_id, {**state, "status": status})
+
+    def claim_expired(self, lease_seconds: float) -> List[Dict]:
+        # The file modification time is the lease; not atomic, so one machine only
+        if not os.path.isdir(self.directory):
+            return []
+        claimed = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json.gz"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) >= time.time() - lease_seconds:
+                    continue
+                state = self.load(name[:-len(".json.gz")])
+                if state is None or state.get("status") != "running":
+                    continue
+                os.utime(path)
+            except FileNotFoundError:
+                continue
+            claimed.append(state)
+        return claimed
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    if settings.CRAWL_CHECKPOINT_STORE == "file":
+        return FileCheckpointStore(settings.CRAWL_CHECKPOINT_DIR)
+    if settings.CRAWL_CHECKPOINT_STORE == "database":
+        return DatabaseCheckpointStore()
+    raise ValueError(f"Unknown crawl checkpoint store: {settings.CRAWL_CHECKPOINT_STORE}")
+
+
+checkpoint_store = get_checkpoint_store()
@@ -0,0 +1,122 @@
+# services/crawl_history.py
+
+import logging
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import CrawlerResult, GSCPageData
+from services.canonical_url import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+CARRIED_FIELDS = ('title', 'meta_description', 'h1', 'h2', 'h3', 'body_text', 'full_text', 'word_count', 'status')
+
+
+def load_previous_pages(db: Session, website_id: int, user_id: int, batch_id: str) -> Dict[str, Dict]:
+    """Validators of the most recent earlier result for every page of a website, keyed by canonical URL.
+
+    A page saved under its rel=canonical URL is also found under the URL it was fetched from.
+    """
+    rows = db.query(
+        CrawlerResult.id,
+        CrawlerResult.page_url,
+        CrawlerResult.fetched_url,
+        CrawlerResult.etag,
+        CrawlerResult.last_modified,
+        CrawlerResult.content_hash,
+        CrawlerResult.links
+    ).filter(
+        CrawlerResult.website_id == website_id,
+        CrawlerResult.user_id == user_id,
+        CrawlerResult.batch_id != batch_id,
+        CrawlerResult.content_hash.isnot(None)
+    ).order_by(
+        CrawlerResult.page_url,
+        CrawlerResult.created_at.desc()
+    ).distinct(CrawlerResult.page_url).all()
+
+    logger.info(f"Loaded validators for {len(rows)} previously crawled pages of website {website_id}")
+    previous_pages = {
+        canonicalize_url(row.page_url): {
+            "id": row.id,
+            "page_url": row.page_url,
+            "etag": row.etag,
+            "last_modified": row.last_modified,
+            "content_hash": row.content_hash,
+            "links": row.links or []
+        }
+        for row in rows
+    }
+    for row in rows:
+        # A page crawled under its own URL wins over another page's alias
+        if row.fetched_url:
+            previous_pages.setdefault(canonicalize_url(row.fetched_url), previous_pages[canonicalize_url(row.page_url)])
+    return previous_pages
+
+
+def load_page_impressions(db: Session, website_id: int, user_id: int) -> Dict[str, int]:
+    """GSC impressions of every page of a website, keyed by canonical URL, to prioritise the crawl frontier."""
+    rows = db.query(
+        GSCPageData.page_url,
+        func.sum(GSCPageData.impressions).label("impressions")
+    ).filter(
+        GSCPageData.website_id == website_id,
+        GSCPageData.user_id == user_id
+    ).group_by(GSCPageData.page_url).all()
+
+    impressions: Dict[str, int] = {}
+    for row in rows:
+        url = canonicalize_url(row.page_url)
+        impressions[url] = impressions.get(url, 0) + int(row.impressions or 0)
+    logger.info(f"Loaded GSC impressions for {len(impressions)} pages of website {website_id}")
+    return impressions
+
+
+def carry_forward_page(db: Session, page: Dict) -> Dict:
+    """Fill an unchanged page from the result it was carried forward from."""
+    previous = db.query(CrawlerResult).filter(CrawlerResult.id == page["previous_result_id"]).first()
+    if previous is None:
+        logger.warning(f"Previous result for {page['url']} disappeared, saving it as failed")
+        return {**page, **{field: None for field in CARRIED_FIELDS}, "status": "fail",
+                "error_message": "Previous result not found"}
+    return {**page, **{field: getattr(previous, field) for field in CARRIED_FIELDS}}
+
+
+def save_crawl_page(db: Session, page: Dict, batch_id: str, website_id: int, user_id: int) -> Optional[Dict]:
+    """Store a crawled page under batch_id, as the API crawl tasks do. Returns None if it was already stored."""
+    if page.get("unchanged"):
+        page = carry_forward_page(db, page)
+    links = page.pop("links", None)
+
+    existing_page = db.query(CrawlerResult).filter(
+        CrawlerResult.page_url == page['url'],
+        CrawlerResult.word_count == page['word_count'],
+        CrawlerResult.batch_id == batch_id,
+        CrawlerResult.website_id == website_id,
+        CrawlerResult.user_id == user_id
+    ).first()
+    if existing_page:
+        return None
+
+    db.add(CrawlerResult(
+        page_url=page['url'],
+        title=page['title'],
+        meta_description=page['meta_description'],
+        h1=page['h1'],
+        h2=page['h2'],
+        h3=page['h3'],
+        body_text=page['body_text'],
+        word_count=page['word_count'],
+        status=page['status'],
+        batch_id=batch_id,
+        website_id=website_id,
+        user_id=user_id,
+        full_text=page['full_text'],
+        etag=page.get('etag'),
+        last_modified=page.get('last_modified'),
+        content_hash=page.get('content_hash'),
+        links=links,
+        fetched_url=page.get('canonical_from')
+    ))
+    db.commit()
+    return page
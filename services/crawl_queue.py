@@ -0,0 +1,129 @@
+# services/crawl_queue.py
+
+import json
+import logging
+import threading
+import zlib
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+import pika
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CRAWL_JOB_QUEUE = 'crawl_jobs_{shard}'
+PROGRESS_EXCHANGE = 'crawl_progress'  # fanout: every API process sees every update
+CONTROL_EXCHANGE = 'crawl_control'  # fanout: every crawl worker sees stop requests
+
+
+def connection_params() -> pika.ConnectionParameters:
+    return pika.ConnectionParameters(
+        host=settings.rabbitmq_host,
+        port=int(settings.rabbitmq_port),
+        credentials=pika.PlainCredentials(
+            settings.rabbitmq_user,
+            settings.rabbitmq_password
+        ),
+        heartbeat=60
+    )
+
+
+def shard_for(url: str) -> int:
+    """Stable shard of a URL's host, so one host is always crawled by the same worker."""
+    host = urlparse(url).netloc.lower()
+    return zlib.crc32(host.encode('utf-8')) % settings.CRAWL_QUEUE_SHARDS
+
+
+def declare_topology(channel) -> None:
+    for shard in range(settings.CRAWL_QUEUE_SHARDS):
+        channel.queue_declare(queue=CRAWL_JOB_QUEUE.format(shard=shard), durable=True)
+    channel.exchange_declare(exchange=PROGRESS_EXCHANGE, exchange_type='fanout')
+    channel.exchange_declare(exchange=CONTROL_EXCHANGE, exchange_type='fanout')
+
+
+class Publisher:
+    """Long-lived publishing connection that reconnects once when the broker dropped it.
+
+    Not thread-safe: use one Publisher per thread.
+    """
+
+    def __init__(self):
+        self.connection: Optional[pika.BlockingConnection] = None
+        self.channel = None
+
+    def connect(self) -> None:
+        self.connection = pika.BlockingConnection(connection_params())
+        self.channel = self.connection.channel()
+        declare_topology(self.channel)
+
+    def publish(self, exchange: str, routing_key: str, message: Dict[str, Any], persistent: bool = False) -> None:
+        body = json.dumps(message, default=str)
+        properties = pika.BasicProperties(delivery_mode=2) if persistent else None
+        for attempt in range(2):
+            try:
+                if self.connection is None or self.connection.is_closed:
+                    self.connect()
+                self.channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body, properties=properties)
+                return
+            except pika.exceptions.AMQPError as e:
+                logger.warning(f"Publishing to RabbitMQ failed, reconnecting: {str(e)}")
+                self.connection = None
+                if attempt:
+                    raise
+
+    def close(self) -> None:
+        if self.connection is not None and not self.connection.is_closed:
+            self.connection.close()
+
+
+def publish_crawl_job(job: Dict[str, Any]) -> None:
+    """Queue a crawl on the shard that owns its host."""
+    publisher = Publisher()
+    try:
+        queue = CRAWL_JOB_QUEUE.format(shard=shard_for(job["base_url"]))
+        publisher.publish('', queue, job, persistent=True)
+        logger.info(f"Queued crawl {job['session_id']} on {queue}")
+    finally:
+        publisher.close()
+
+
+def publish_stop(session_id: str) -> None:
+    publisher = Publisher()
+    try:
+        publisher.publish(CONTROL_EXCHANGE, '', {"type": "stop", "session_id": session_id})
+    finally:
+        publisher.close()
+
+
+class ProgressListener:
+    """Receives crawl worker progress in a background thread and hands it to a callback."""
+
+    def __init__(self, on_progress: Callable[[Dict[str, Any]], None]):
+        self.on_progress = on_progress
+        self.thread = threading.Thread(target=self.consume, daemon=True)
+
+    def start(self) -> "ProgressListener":
+        self.thread.start()
+        return self
+
+    def consume(self) -> None:
+        while True:
+            try:
+                connection = pika.BlockingConnection(connection_params())
+                channel = connection.channel()
+                declare_topology(channel)
+                # Exclusive queue per API process, bound to the fanout exchange
+                queue = channel.queue_declare(queue='', exclusive=True).method.queue
+                channel.queue_bind(exchange=PROGRESS_EXCHANGE, queue=queue)
+                channel.basic_consume(queue=queue, on_message_callback=self.handle, auto_ack=True)
+                logger.info("Listening for crawl worker progress")
+                channel.start_consuming()
+            except pika.exceptions.AMQPError as e:
+                logger.error(f"Crawl progress listener lost RabbitMQ connection: {str(e)}")
+                threading.Event().wait(5)
+
+    def handle(self, ch, method, props, body) -> None:
+        try:
+            self.on_progress(json.loads(body))
+        except Exception as e:
+            logger.error(f"Error handling crawl progress: {str(e)}")
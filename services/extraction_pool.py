@@ -0,0 +1,73 @@
+# services/extraction_pool.py
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionPool:
+    """Runs CPU-bound HTML extraction in worker processes so the event loop stays responsive.
+
+    The whole pool is replaced after max_tasks_per_pool tasks so memory leaked by
+    lxml/trafilatura in long-lived workers is returned to the OS. Tasks already
+    running on the old pool finish before its processes exit.
+    """
+
+    def __init__(self, max_workers: int, max_tasks_per_pool: int):
+        self.max_workers = max_workers
+        self.max_tasks_per_pool = max_tasks_per_pool
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.tasks_submitted = 0
+        self.pools_started = 0
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is not None and self.tasks_submitted < self.max_tasks_per_pool:
+            return self.executor
+
+        old_executor = self.executor
+        # spawn, not fork: the API process runs threads (RabbitMQ consumer) that fork would copy mid-state
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self.tasks_submitted = 0
+        self.pools_started += 1
+        if old_executor is not None:
+            logger.info(f"Recycling extraction pool after {self.max_tasks_per_pool} tasks")
+            old_executor.shutdown(wait=False)
+        return self.executor
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run func(*args) in a worker process. Arguments and result must be picklable."""
+        if self.max_workers <= 0:
+            # Pool disabled: run inline on the event loop
+            return func(*args)
+
+        executor = self.get_executor()
+        self.tasks_submitted += 1
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM killed); start a fresh pool for the next task
+            logger.error("Extraction worker died, restarting the pool")
+            if self.executor is executor:
+                self.executor = None
+            raise
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+
+extraction_pool = ExtractionPool(
+    max_workers=settings.EXTRACTION_WORKERS,
+    max_tasks_per_pool=settings.EXTRACTION_TASKS_PER_POOL,
+)
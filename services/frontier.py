@@ -0,0 +1,126 @@
+# services/frontier.py
+
+import hashlib
+import heapq
+import itertools
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class BloomFilter:
+    """Fixed-size set membership with a bounded false positive rate and no false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        # Double hashing: k positions from two independent 64-bit hashes
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+
+class Frontier:
+    """URLs waiting to be crawled, highest score first, each accepted at most once per crawl.
+
+    Every URL ever enqueued is remembered, so re-discovering a link is a
+    constant-time no-op and the queue never holds duplicates. With
+    bloom_capacity set, the remembered URLs are kept in a Bloom filter of fixed
+    size instead of a set; a false positive then means a URL is skipped. The
+    filter is not checkpointed (it is sized for the whole crawl, ~18 MB by
+    default) but rebuilt on resume from the queue and the URLs the caller
+    remembers, so a URL that was dropped (failed, skipped) may be queued again.
+
+    URLs are remembered by key(url), e.g. their canonical form, so variants of
+    an enqueued URL are not queued again; the queue keeps the URL as given.
+
+    Each URL carries its link depth, which pop() hands back so the crawler can
+    give the URLs found on that page depth + 1. URLs of equal score come out in
+    the order they were added.
+    """
+
+    def __init__(self, bloom_capacity: Optional[int] = None, bloom_error_rate: float = 0.001,
+                 key: Optional[Callable[[str], str]] = None):
+        # (-score, insertion order, url, depth)
+        self.heap: List[Tuple[float, int, str, int]] = []
+        self.order = itertools.count()
+        self.seen = BloomFilter(bloom_capacity, bloom_error_rate) if bloom_capacity else set()
+        self.enqueued = 0
+        self.key = key or (lambda url: url)
+
+    def push(self, url: str, score: float, depth: int) -> None:
+        heapq.heappush(self.heap, (-score, next(self.order), url, depth))
+
+    def add(self, url: str, score: float = 0.0, depth: int = 0, key: Optional[str] = None) -> bool:
+        """Queue url unless it was queued before. Returns whether it was added; pass key if it is known."""
+        if key is None:
+            key = self.key(url)
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        self.push(url, score, depth)
+        self.enqueued += 1
+        return True
+
+    def remember(self, url: str) -> None:
+        """Mark url as seen without queueing it, for URLs fetched some other way (redirect targets)."""
+        self.seen.add(self.key(url))
+
+    def extend(self, urls: Iterable[str], score: float = 0.0, depth: int = 0) -> int:
+        return sum(1 for url in urls if self.add(url, score, depth))
+
+    def pop(self) -> Tuple[str, int, float]:
+        """(url, depth, score) of the highest scoring URL."""
+        negative_score, _, url, depth = heapq.heappop(self.heap)
+        return url, depth, -negative_score
+
+    def __contains__(self, url: str) -> bool:
+        """Whether url was ever enqueued."""
+        return self.key(url) in self.seen
+
+    def __len__(self) -> int:
+        """URLs still waiting."""
+        return len(self.heap)
+
+    def to_state(self, unfinished: Iterable[Tuple[str, int, float]] = ()) -> Dict:
+        """JSON-serialisable snapshot; unfinished entries were popped but not completed."""
+        return {
+            "queue": [list(entry) for entry in unfinished] + [
+                [url, depth, -negative_score] for negative_score, _, url, depth in sorted(self.heap)
+            ],
+            "seen": None if isinstance(self.seen, BloomFilter) else list(self.seen),
+            "enqueued": self.enqueued
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict, key: Optional[Callable[[str], str]] = None,
+                   bloom_capacity: Optional[int] = None, bloom_error_rate: float = 0.001,
+                   remembered: Iterable[str] = ()) -> "Frontier":
+        """Frontier of a to_state() snapshot; a Bloom filter is rebuilt from the queue and the remembered keys."""
+        seen = state["seen"]
+        if isinstance(seen, list):
+            frontier = cls(key=key)
+            frontier.seen = set(seen)
+        else:
+            # Bloom filter mode (older checkpoints embedded the bit array, which is ignored)
+            frontier = cls(bloom_capacity, bloom_error_rate, key=key)
+            for url_key in remembered:
+                frontier.seen.add(url_key)
+        for entry in state["queue"]:
+            # Checkpoints from before scoring hold bare URLs
+            url, depth, score = (entry, 0, 0.0) if isinstance(entry, str) else entry
+            frontier.push(url, score, depth)
+            frontier.seen.add(frontier.key(url))
+        frontier.enqueued = state["enqueued"]
+        return frontier
@@ -0,0 +1,219 @@
+# services/host_concurrency.py
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import httpx
+from config import settings
+from services.rate_limiter import TokenBucket, host_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Responses that mean the host is overloaded, not that the page is bad
+OVERLOAD_STATUSES = {429, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RequestOutcome:
+    """What one request told us about its host, filled in by the caller."""
+    __slots__ = ('status_code', 'latency', 'retry_after', 'failed')
+
+    def __init__(self):
+        self.status_code: Optional[int] = None
+        self.latency: Optional[float] = None
+        self.retry_after: Optional[float] = None
+        self.failed = False
+
+    def record(self, response: httpx.Response, latency: float) -> None:
+        self.record_status(response.status_code, response.headers.get("retry-after"), latency)
+
+    def record_status(self, status_code: int, retry_after: Optional[str], latency: float) -> None:
+        """Record a response by its status and Retry-After header, e.g. of a browser navigation."""
+        self.status_code = status_code
+        self.latency = latency
+        if status_code in OVERLOAD_STATUSES:
+            self.retry_after = parse_retry_after(retry_after)
+
+
+class HostLimit:
+    """AIMD concurrency window and request rate of one host.
+
+    Every healthy response grows the window by increase / window, so it gains
+    about `increase` per round trip of the whole window. An overload status, a
+    connection failure or latency above latency_factor times the best latency
+    seen shrinks it by decrease_factor, at most once per cooldown so one burst
+    of failures counts once. Retry-After additionally pauses the host.
+
+    The host's politeness token bucket, if given, follows the same decisions:
+    healthy responses add rate_increase / rate requests per second, about
+    rate_increase per second of traffic, up to max_rate; a decrease multiplies
+    it by decrease_factor down to min_rate. Otherwise the bucket would cap
+    throughput whatever the window.
+    """
+
+    def __init__(self, min_limit: int, max_limit: int, initial: int, increase: float,
+                 decrease_factor: float, latency_factor: float, bucket: Optional[TokenBucket] = None,
+                 min_rate: float = 0.0, max_rate: float = 0.0, rate_increase: float = 0.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(initial)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.bucket = bucket
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate_increase = rate_increase
+
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.latency: Optional[float] = None  # moving average
+        self.best_latency: Optional[float] = None
+        # Created on first use so it binds to the running event loop
+        self.slot_freed: Optional[asyncio.Event] = None
+
+        self.stats = {"requests": 0, "increases": 0, "decreases": 0, "errors": 0, "retry_after_pauses": 0}
+        self.last_decrease_reason: Optional[str] = None
+
+    async def acquire(self) -> None:
+        if self.slot_freed is None:
+            self.slot_freed = asyncio.Event()
+        while True:
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            self.slot_freed.clear()
+            await self.slot_freed.wait()
+
+    def release(self, outcome: RequestOutcome) -> None:
+        self.in_flight -= 1
+        self.stats["requests"] += 1
+        self.adjust(outcome)
+        if self.slot_freed is not None:
+            self.slot_freed.set()
+
+    def adjust(self, outcome: RequestOutcome) -> None:
+        if outcome.retry_after:
+            retry_after = min(outcome.retry_after, settings.HOST_MAX_RETRY_AFTER)
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            self.stats["retry_after_pauses"] += 1
+
+        if outcome.failed or outcome.status_code in OVERLOAD_STATUSES:
+            self.stats["errors"] += 1
+            self.decrease("errors" if outcome.failed else f"status {outcome.status_code}")
+            return
+
+        if outcome.latency is None:
+            return
+        self.latency = outcome.latency if self.latency is None else 0.8 * self.latency + 0.2 * outcome.latency
+        self.best_latency = self.latency if self.best_latency is None else min(self.best_latency, self.latency)
+        if self.latency > self.latency_factor * self.best_latency:
+            self.decrease("latency")
+            return
+        if self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+            self.stats["increases"] += 1
+        if self.bucket is not None and self.bucket.rate < self.max_rate:
+            self.bucket.set_rate(min(self.max_rate, self.bucket.rate + self.rate_increase / self.bucket.rate))
+
+    def decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        cooldown = max(1.0, self.latency or 0.0)
+        if now - self.last_decrease < cooldown:
+            return
+        self.last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        if self.bucket is not None:
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate * self.decrease_factor))
+        self.stats["decreases"] += 1
+        self.last_decrease_reason = reason
+        rate = f" and rate to {self.bucket.rate:.2f}/s" if self.bucket is not None else ""
+        logger.info(f"Lowering concurrency to {int(self.limit)}{rate} ({reason})")
+        if reason == "latency" and self.best_latency is not None:
+            # Let the baseline drift up, or one unusually fast response pins the window low forever
+            self.best_latency = (self.best_latency + self.latency) / 2
+
+    def get_metrics(self) -> Dict:
+        return {
+            "limit": int(self.limit),
+            "rate_per_second": round(self.bucket.rate, 3) if self.bucket is not None else None,
+            "in_flight": self.in_flight,
+            "latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "best_latency_seconds": round(self.best_latency, 3) if self.best_latency is not None else None,
+            "paused_seconds": round(max(0.0, self.paused_until - time.monotonic()), 1),
+            "last_decrease_reason": self.last_decrease_reason,
+            **self.stats,
+        }
+
+
+class HostConcurrency:
+    """Per-host adaptive concurrency shared by every crawl running in this process."""
+
+    def __init__(self):
+        self.hosts: Dict[str, HostLimit] = {}
+
+    def get_limit(self, host: str) -> HostLimit:
+        host = host.lower()
+        limit = self.hosts.get(host)
+        if limit is None:
+            limit = HostLimit(
+                min_limit=settings.HOST_MIN_CONCURRENCY,
+                max_limit=settings.HOST_MAX_CONCURRENCY,
+                initial=settings.HOST_INITIAL_CONCURRENCY,
+                increase=settings.HOST_CONCURRENCY_INCREASE,
+                decrease_factor=settings.HOST_CONCURRENCY_DECREASE_FACTOR,
+                latency_factor=settings.HOST_LATENCY_FACTOR,
+                bucket=host_rate_limiter.get_bucket(host),
+                min_rate=settings.HOST_MIN_REQUESTS_PER_SECOND,
+                max_rate=settings.HOST_MAX_REQUESTS_PER_SECOND,
+                rate_increase=settings.HOST_RATE_INCREASE
+            )
+            self.hosts[host] = limit
+        return limit
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        """Hold one of host's request slots; record the response on the yielded RequestOutcome."""
+        limit = self.get_limit(host)
+        await limit.acquire()
+        outcome = RequestOutcome()
+        try:
+            yield outcome
+        except httpx.TransportError:
+            outcome.failed = True
+            raise
+        finally:
+            limit.release(outcome)
+
+    def get_metrics(self, host: Optional[str] = None) -> Dict:
+        """Metrics for one host, or for every host seen so far."""
+        if host is not None:
+            return self.get_limit(host).get_metrics()
+        return {name: limit.get_metrics() for name, limit in self.hosts.items()}
+
+
+host_concurrency = HostConcurrency()
@@ -0,0 +1,135 @@
+# services/html_archive.py
+
+import gzip
+import logging
+import os
+import re
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# httpx hands over decoded bodies, so the transfer headers no longer describe them
+DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+CHARSET = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+class ArchiveRecord(NamedTuple):
+    """One archived page: a "response" (the fetched HTML) or a "resource" (the DOM Playwright rendered)."""
+    record_type: str
+    url: str
+    date: str
+    status_code: Optional[int]
+    headers: Dict[str, str]
+    body: bytes
+
+    @property
+    def encoding(self) -> Optional[str]:
+        """Charset declared in the Content-Type header, as the crawler passed it to the parser."""
+        match = CHARSET.search(self.headers.get('content-type', ''))
+        return match.group(1) if match else None
+
+
+class HtmlArchive:
+    """Append-only WARC file of the HTML fetched for one batch.
+
+    Every record is compressed as its own gzip member, the way .warc.gz files
+    are written, so appending never rewrites the file and a crash mid-write
+    loses at most the record being written. Bodies are stored decoded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.records_written = 0
+
+    def write_response(self, url: str, status_code: int, reason: str, headers: List[Tuple[bytes, bytes]],
+                       body: bytes) -> None:
+        """Archive a fetched page; headers are the raw (name, value) pairs of the response."""
+        http_headers = b''.join(
+            name + b": " + value + b"\r\n" for name, value in headers
+            if name.decode('latin-1').lower() not in DROPPED_HEADERS
+        )
+        payload = (f"HTTP/1.1 {status_code} {reason}\r\n".encode('latin-1', 'replace') + http_headers +
+                   f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+        self.append("response", url, "application/http;msgtype=response", payload)
+
+    def write_rendered(self, url: str, html: str) -> None:
+        self.append("resource", url, "text/html; charset=utf-8", html.encode('utf-8'))
+
+    def append(self, record_type: str, url: str, content_type: str, payload: bytes) -> None:
+        warc_headers = (
+            "WARC/1.1\r\n"
+            f"WARC-Type: {record_type}\r\n"
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+            f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+            f"WARC-Target-URI: {url}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n"
+        ).encode('utf-8')
+        member = gzip.compress(warc_headers + payload + b"\r\n\r\n", compresslevel=settings.HTML_ARCHIVE_COMPRESSION)
+        with self.lock:
+            with open(self.path, 'ab') as f:
+                f.write(member)
+            self.records_written += 1
+
+    def __iter__(self) -> Iterator[ArchiveRecord]:
+        """Records in the order they were written; a truncated last record is skipped."""
+        with gzip.open(self.path, 'rb') as f:
+            try:
+                while True:
+                    version = f.readline()
+                    if not version:
+                        return
+                    if not version.startswith(b"WARC/"):
+                        raise ValueError(f"Not a WARC record in {self.path}: {version[:40]!r}")
+                    warc_headers = read_headers(f)
+                    payload = f.read(int(warc_headers['content-length']))
+                    f.read(4)  # the \r\n\r\n that ends every record
+                    yield parse_record(warc_headers, payload)
+            except EOFError:
+                logger.warning(f"{self.path} ends with a truncated record, it was skipped")
+
+
+def read_headers(f) -> Dict[str, str]:
+    headers = {}
+    for line in iter(f.readline, b""):
+        line = line.decode('utf-8', 'replace').rstrip('\r\n')
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def parse_record(warc_headers: Dict[str, str], payload: bytes) -> ArchiveRecord:
+    record_type = warc_headers.get('warc-type', '')
+    status_code = None
+    headers = {'content-type': warc_headers.get('content-type', '')}
+    body = payload
+    if record_type == "response":
+        head, _, body = payload.partition(b"\r\n\r\n")
+        lines = head.decode('latin-1').split("\r\n")
+        status_code = int(lines[0].split()[1])
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    return ArchiveRecord(record_type, warc_headers.get('warc-target-uri', ''), warc_headers.get('warc-date', ''),
+                         status_code, headers, body)
+
+
+def archive_path(batch_id: str) -> str:
+    # Batch ids come from the API; never let one escape the directory
+    return os.path.join(settings.HTML_ARCHIVE_DIR, f"{os.path.basename(batch_id)}.warc.gz")
+
+
+def open_archive(batch_id: str) -> Optional[HtmlArchive]:
+    """Archive to append a crawl of batch_id to, or None when HTML_ARCHIVE is off."""
+    if not settings.HTML_ARCHIVE:
+        return None
+    os.makedirs(settings.HTML_ARCHIVE_DIR, exist_ok=True)
+    return HtmlArchive(archive_path(batch_id))
@@ -0,0 +1,277 @@
+# services/http_client.py
+
+import asyncio
+import importlib.util
+import ipaddress
+import logging
+import socket
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+import httpcore
+import httpx
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# httpcore errors and the httpx errors the crawler handles, most specific first
+HTTPCORE_ERRORS = (
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.ProxyError, httpx.ProxyError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+)
+
+
+@contextmanager
+def httpx_errors():
+    """Re-raise httpcore errors as their httpx counterparts."""
+    try:
+        yield
+    except Exception as e:
+        for httpcore_error, httpx_error in HTTPCORE_ERRORS:
+            if isinstance(e, httpcore_error):
+                raise httpx_error(str(e)) from e
+        raise
+
+
+class CountedStream(httpcore.AsyncNetworkStream):
+    """Network stream that keeps its backend's count of open connections."""
+
+    def __init__(self, stream: httpcore.AsyncNetworkStream, stats: Dict[str, int]):
+        self.stream = stream
+        self.stats = stats
+        self.closed = False
+        stats["open_connections"] += 1
+        stats["connections_opened"] += 1
+
+    async def read(self, max_bytes: int, timeout: Optional[float] = None) -> bytes:
+        return await self.stream.read(max_bytes, timeout=timeout)
+
+    async def write(self, buffer: bytes, timeout: Optional[float] = None) -> None:
+        await self.stream.write(buffer, timeout=timeout)
+
+    async def aclose(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.stats["open_connections"] -= 1
+        await self.stream.aclose()
+
+    async def start_tls(self, ssl_context, server_hostname: Optional[str] = None,
+                        timeout: Optional[float] = None) -> httpcore.AsyncNetworkStream:
+        # Still the same connection, now wrapped in TLS
+        self.stream = await self.stream.start_tls(ssl_context, server_hostname=server_hostname, timeout=timeout)
+        return self
+
+    def get_extra_info(self, info: str):
+        return self.stream.get_extra_info(info)
+
+
+class CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """httpcore network backend that remembers DNS answers for ttl seconds.
+
+    Connections are opened to the cached IP addresses; TLS still verifies and
+    sends SNI for the original host name, which httpcore passes separately.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.backend = httpcore.AnyIOBackend()
+        self.cache: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+        self.lookups: Dict[Tuple[str, int], asyncio.Future] = {}
+        self.stats = {"dns_hits": 0, "dns_misses": 0, "open_connections": 0, "connections_opened": 0}
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        cached = self.cache.get((host, port))
+        if cached is not None and cached[0] > time.monotonic():
+            self.stats["dns_hits"] += 1
+            return cached[1]
+
+        # Concurrent connections to a new host share one lookup
+        lookup = self.lookups.get((host, port))
+        if lookup is None:
+            self.stats["dns_misses"] += 1
+            lookup = asyncio.ensure_future(self.lookup(host, port))
+            self.lookups[(host, port)] = lookup
+            lookup.add_done_callback(lambda _lookup: self.lookups.pop((host, port), None))
+        return await asyncio.shield(lookup)
+
+    async def lookup(self, host: str, port: int) -> List[str]:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        self.cache[(host, port)] = (time.monotonic() + self.ttl, addresses)
+        return addresses
+
+    async def connect_tcp(self, host: str, port: int, timeout: Optional[float] = None,
+                          local_address: Optional[str] = None, socket_options=None) -> httpcore.AsyncNetworkStream:
+        try:
+            ipaddress.ip_address(host)
+            addresses = [host]
+        except ValueError:
+            try:
+                addresses = await self.resolve(host, port)
+            except socket.gaierror as e:
+                raise httpcore.ConnectError(str(e)) from e
+
+        for i, address in enumerate(addresses):
+            try:
+                stream = await self.backend.connect_tcp(address, port, timeout=timeout, local_address=local_address,
+                                                        socket_options=socket_options)
+                return CountedStream(stream, self.stats)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout):
+                if i == len(addresses) - 1:
+                    # The host may have moved; look it up again next time
+                    self.cache.pop((host, port), None)
+                    raise
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None,
+                                  socket_options=None) -> httpcore.AsyncNetworkStream:
+        return await self.backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self.backend.sleep(seconds)
+
+
+class HostSlotStream(httpx.AsyncByteStream):
+    """httpcore response body that gives the host's connection slot back once it is closed."""
+
+    def __init__(self, stream, slot: asyncio.Semaphore):
+        self.stream = stream
+        self.slot = slot
+        self.released = False
+
+    async def __aiter__(self):
+        with httpx_errors():
+            async for chunk in self.stream:
+                yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            with httpx_errors():
+                await self.stream.aclose()
+        finally:
+            if not self.released:
+                self.released = True
+                self.slot.release()
+
+
+class CrawlerTransport(httpx.AsyncBaseTransport):
+    """httpcore connection pool with cached DNS and at most max_per_host open requests per host."""
+
+    def __init__(self, max_per_host: int, dns_ttl: float, http2: bool, limits: httpx.Limits):
+        # One SSL context for every connection, so certificates are loaded once
+        ssl_context = httpx.create_ssl_context()
+        self.network_backend = CachingNetworkBackend(dns_ttl)
+        self.pool = httpcore.AsyncConnectionPool(
+            ssl_context=ssl_context,
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=self.network_backend
+        )
+        self.max_per_host = max_per_host
+        self.host_slots: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(self.max_per_host))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        slot = self.host_slots[request.url.host]
+        await slot.acquire()
+        try:
+            with httpx_errors():
+                response = await self.pool.handle_async_request(httpcore.Request(
+                    method=request.method,
+                    url=httpcore.URL(
+                        scheme=request.url.raw_scheme,
+                        host=request.url.raw_host,
+                        port=request.url.port,
+                        target=request.url.raw_path
+                    ),
+                    headers=request.headers.raw,
+                    content=request.stream,
+                    extensions=request.extensions
+                ))
+        except BaseException:
+            slot.release()
+            raise
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=HostSlotStream(response.stream, slot),
+            extensions=response.extensions
+        )
+
+    async def aclose(self) -> None:
+        await self.pool.aclose()
+
+
+class HttpClientManager:
+    """Process-wide httpx client shared by every crawl.
+
+    Connections stay open for keepalive_expiry seconds after use, so back-to-back
+    and concurrent crawls of a host reuse them without a new TCP or TLS handshake.
+    A new connection does a full handshake: the shared SSL context does not resume
+    TLS sessions, which CPython only does when given the session explicitly. HTTP/2
+    is negotiated when the optional h2 package is installed. The client is bound to
+    the event loop it was created on and is rebuilt if it is used from another one.
+    """
+
+    def __init__(self):
+        self.client: Optional[httpx.AsyncClient] = None
+        self.transport: Optional[CrawlerTransport] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.http2 = settings.HTTP2 and importlib.util.find_spec("h2") is not None
+        if settings.HTTP2 and not self.http2:
+            logger.warning("HTTP2 is enabled but the h2 package is not installed, using HTTP/1.1")
+        self.clients_created = 0
+
+    def get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self.client is not None and self.loop is loop and not self.client.is_closed:
+            return self.client
+
+        self.transport = CrawlerTransport(
+            max_per_host=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+            dns_ttl=settings.DNS_CACHE_TTL,
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+        self.client = httpx.AsyncClient(
+            timeout=settings.TIMEOUT,
+            headers={"User-Agent": settings.USER_AGENT},
+            transport=self.transport
+        )
+        self.loop = loop
+        self.clients_created += 1
+        logger.info(f"HTTP client initialized (http2={self.http2}, max_connections={settings.HTTP_MAX_CONNECTIONS})")
+        return self.client
+
+    async def close(self) -> None:
+        if self.client is not None and self.loop is asyncio.get_running_loop():
+            await self.client.aclose()
+        self.client = None
+        self.transport = None
+
+    def get_metrics(self) -> Dict:
+        metrics = {"http2": self.http2, "clients_created": self.clients_created}
+        if self.transport is not None:
+            metrics.update(self.transport.network_backend.stats)
+        return metrics
+
+
+http_client_manager = HttpClientManager()
@@ -0,0 +1,98 @@
+# services/rate_limiter.py
+
+import asyncio
+import time
+import logging
+from typing import Dict, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket for a single host."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+        # Metrics
+        self.requests = 0
+        self.throttled_requests = 0
+        self.total_wait_seconds = 0.0
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds the caller must wait before using it.
+
+        Tokens may go negative: each caller reserves its own slot in the future, so
+        concurrent callers are spaced out instead of all waking up at the same moment.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        self.requests += 1
+
+        if self.tokens >= 0:
+            return 0.0
+
+        wait = -self.tokens / self.rate
+        self.throttled_requests += 1
+        self.total_wait_seconds += wait
+        return wait
+
+    def set_rate(self, rate: float) -> None:
+        """Change the rate; tokens earned so far are credited at the old one."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.rate = rate
+
+    def get_metrics(self) -> Dict:
+        return {
+            "rate_per_second": round(self.rate, 3),
+            "burst": self.burst,
+            "requests": self.requests,
+            "throttled_requests": self.throttled_requests,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+        }
+
+
+class HostRateLimiter:
+    """Per-host politeness limiter shared by every crawl running in this process."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def get_bucket(self, host: str) -> TokenBucket:
+        host = host.lower()
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+            self.buckets[host] = bucket
+        return bucket
+
+    async def acquire(self, host: str) -> float:
+        """Wait until a request to host is allowed. Returns the time waited in seconds."""
+        # reserve() never awaits, so no lock is needed inside a single event loop
+        wait = self.get_bucket(host).reserve()
+        if wait > 0:
+            logger.debug(f"Rate limiting {host}: waiting {wait:.2f}s")
+            await asyncio.sleep(wait)
+        return wait
+
+    def get_metrics(self, host: Optional[str] = None) -> Dict:
+        """Metrics for one host, or for every host seen so far."""
+        if host is not None:
+            return self.get_bucket(host).get_metrics()
+        return {name: bucket.get_metrics() for name, bucket in self.buckets.items()}
+
+
+host_rate_limiter = HostRateLimiter(
+    rate=settings.HOST_REQUESTS_PER_SECOND or 1 / settings.REQUEST_DELAY,
+    burst=settings.HOST_BURST,
+)
@@ -0,0 +1,107 @@
+# services/render_policy.py
+
+import logging
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+HOST_PATTERN = "*"  # decision shared by every path of a host that has no pattern of its own yet
+
+
+class PatternStats:
+    """What fetching URLs of one host/path pattern has needed so far."""
+
+    __slots__ = ("fetches", "fallbacks", "consecutive_fallbacks", "direct_renders", "render_first")
+
+    def __init__(self):
+        self.fetches = 0
+        self.fallbacks = 0
+        self.consecutive_fallbacks = 0
+        self.direct_renders = 0
+        self.render_first = False
+
+    def as_dict(self) -> Dict:
+        return {
+            "fetches": self.fetches,
+            "fallbacks": self.fallbacks,
+            "consecutive_fallbacks": self.consecutive_fallbacks,
+            "direct_renders": self.direct_renders,
+            "render_first": self.render_first,
+        }
+
+
+class RenderPolicy:
+    """Learns per host and path pattern whether pages only have content after rendering.
+
+    Once fallback_threshold fetches in a row needed Playwright, URLs matching the
+    pattern skip the plain HTTP pass and go straight to the browser. Every
+    probe_interval direct renders one URL takes the normal path again, so a site
+    that starts serving server-side HTML is noticed.
+    """
+
+    def __init__(self, fallback_threshold: int, probe_interval: int):
+        self.fallback_threshold = fallback_threshold
+        self.probe_interval = probe_interval
+        self.patterns: Dict[Tuple[str, str], PatternStats] = {}
+
+    @staticmethod
+    def pattern_for(url: str) -> Tuple[str, str]:
+        """Group URLs by host and first path segment, e.g. /blog/* or /* for top-level pages."""
+        parsed = urlparse(url)
+        segments = [segment for segment in parsed.path.split('/') if segment]
+        if not segments:
+            pattern = "/"
+        elif len(segments) == 1:
+            pattern = "/*"
+        else:
+            pattern = f"/{segments[0]}/*"
+        return parsed.netloc.lower(), pattern
+
+    def lookup(self, url: str) -> Optional[PatternStats]:
+        host, pattern = self.pattern_for(url)
+        return self.patterns.get((host, pattern)) or self.patterns.get((host, HOST_PATTERN))
+
+    def should_render_first(self, url: str) -> bool:
+        if self.fallback_threshold <= 0:
+            return False
+        stats = self.lookup(url)
+        if stats is None or not stats.render_first:
+            return False
+        stats.direct_renders += 1
+        if self.probe_interval > 0 and stats.direct_renders % self.probe_interval == 0:
+            logger.info(f"Probing plain fetch again for {url}")
+            return False
+        return True
+
+    def record(self, url: str, rendered: bool) -> None:
+        """Record whether the plain HTTP pass for url had to be redone in the browser."""
+        host, pattern = self.pattern_for(url)
+        for key in ((host, pattern), (host, HOST_PATTERN)):
+            stats = self.patterns.get(key)
+            if stats is None:
+                stats = self.patterns[key] = PatternStats()
+            stats.fetches += 1
+            if rendered:
+                stats.fallbacks += 1
+                stats.consecutive_fallbacks += 1
+                if not stats.render_first and stats.consecutive_fallbacks >= self.fallback_threshold:
+                    stats.render_first = True
+                    logger.info(f"Rendering {host}{'' if key[1] == HOST_PATTERN else key[1]} in the browser first")
+            else:
+                stats.consecutive_fallbacks = 0
+                stats.render_first = False
+
+    def get_metrics(self, host: Optional[str] = None) -> Dict:
+        return {
+            f"{pattern_host}{pattern}": stats.as_dict()
+            for (pattern_host, pattern), stats in self.patterns.items()
+            if host is None or pattern_host == host.lower()
+        }
+
+
+render_policy = RenderPolicy(
+    fallback_threshold=settings.RENDER_FALLBACK_THRESHOLD,
+    probe_interval=settings.RENDER_PROBE_INTERVAL,
+)
@@ -0,0 +1,192 @@
+# services/robots_cache.py
+
+import asyncio
+import re
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import httpx
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_MATCH_CACHE_SIZE = 10000
+FAILED_FETCH_TTL = 300  # retry an unreachable robots.txt after 5 minutes
+
+
+class RobotsRules:
+    """robots.txt rules for one user agent, compiled for fast repeated lookups.
+
+    Plain path rules go into a character trie so a lookup walks the path once.
+    Rules containing '*' or '$' are compiled to regexes. Longest match wins and
+    Allow wins ties, as described in RFC 9309.
+    """
+
+    def __init__(self, rules: List[Tuple[bool, str]], sitemaps: Optional[List[str]] = None):
+        self.trie: Dict = {}
+        self.sitemaps = sitemaps or []
+        self.patterns: List[Tuple[int, bool, re.Pattern]] = []
+        self.match_cache: Dict[str, bool] = {}
+        self.rule_count = len(rules)
+
+        for allow, path in rules:
+            if '*' in path or path.endswith('$'):
+                self.patterns.append((len(path), allow, self.compile_pattern(path)))
+                continue
+            node = self.trie
+            for char in path:
+                node = node.setdefault(char, {})
+            # Allow wins if the same path is both allowed and disallowed
+            node[None] = node.get(None, False) or allow
+
+    @staticmethod
+    def compile_pattern(path: str) -> re.Pattern:
+        anchored = path.endswith('$')
+        if anchored:
+            path = path[:-1]
+        regex = '.*'.join(re.escape(part) for part in path.split('*'))
+        return re.compile(regex + ('$' if anchored else ''))
+
+    @classmethod
+    def parse(cls, text: str, user_agent: str) -> "RobotsRules":
+        """Parse robots.txt and keep only the group that applies to user_agent."""
+        agent_token = user_agent.split('/')[0].strip().lower()
+        groups: List[Tuple[List[str], List[Tuple[bool, str]]]] = []
+        agents: List[str] = []
+        rules: Optional[List[Tuple[bool, str]]] = None
+        sitemaps: List[str] = []
+
+        for raw_line in text.splitlines():
+            line = raw_line.split('#', 1)[0].strip()
+            if ':' not in line:
+                continue
+            field, value = line.split(':', 1)
+            field = field.strip().lower()
+            value = value.strip()
+
+            if field == 'sitemap':
+                # Sitemap lines are not part of any group
+                if value:
+                    sitemaps.append(value)
+            elif field == 'user-agent':
+                # A user-agent line after rules starts a new group
+                if rules is not None:
+                    groups.append((agents, rules))
+                    agents, rules = [], None
+                agents.append(value.lower())
+            elif field in ('allow', 'disallow'):
+                if not agents:
+                    continue
+                if rules is None:
+                    rules = []
+                # An empty Disallow allows everything, so there is nothing to store
+                if value:
+                    rules.append((field == 'allow', value))
+        if agents:
+            groups.append((agents, rules or []))
+
+        specific = [
+            group_rules for group_agents, group_rules in groups
+            if any(agent != '*' and agent in agent_token for agent in group_agents)
+        ]
+        if not specific:
+            specific = [group_rules for group_agents, group_rules in groups if '*' in group_agents]
+        return cls([rule for group_rules in specific for rule in group_rules], sitemaps)
+
+    def is_allowed(self, url: str) -> bool:
+        parsed = urlparse(url)
+        path = parsed.path or '/'
+        if parsed.query:
+            path = f"{path}?{parsed.query}"
+        return self.is_path_allowed(path)
+
+    def is_path_allowed(self, path: str) -> bool:
+        """is_allowed for a path (with its query) that is already split off the URL."""
+        cached = self.match_cache.get(path)
+        if cached is not None:
+            return cached
+
+        best_length = -1
+        best_allow = True
+        node = self.trie
+        depth = 0
+        while True:
+            if None in node:
+                best_length, best_allow = depth, node[None]
+            if depth == len(path):
+                break
+            node = node.get(path[depth])
+            if node is None:
+                break
+            depth += 1
+
+        for length, allow, pattern in self.patterns:
+            if pattern.match(path) and (length > best_length or (length == best_length and allow)):
+                best_length, best_allow = length, allow
+
+        if len(self.match_cache) >= MAX_MATCH_CACHE_SIZE:
+            self.match_cache.clear()
+        self.match_cache[path] = best_allow
+        return best_allow
+
+
+class RobotsCache:
+    """Per-host cache of parsed robots.txt, shared by every crawl in this process."""
+
+    def __init__(self, default_ttl: int):
+        self.default_ttl = default_ttl
+        self.entries: Dict[str, Tuple[Optional[RobotsRules], float]] = {}
+        self.locks: Dict[str, asyncio.Lock] = {}
+
+    def get_ttl(self, response: httpx.Response) -> int:
+        """Cache lifetime from Cache-Control, capped at the configured default."""
+        cache_control = response.headers.get('cache-control', '').lower()
+        if 'no-store' in cache_control or 'no-cache' in cache_control:
+            return 0
+        match = re.search(r'max-age=(\d+)', cache_control)
+        if match:
+            return min(int(match.group(1)), self.default_ttl)
+        return self.default_ttl
+
+    async def get_rules(self, client: httpx.AsyncClient, base_url: str) -> Optional[RobotsRules]:
+        """Return compiled rules for the host of base_url, or None when there are no restrictions to apply."""
+        parsed = urlparse(base_url)
+        host = f"{parsed.scheme}://{parsed.netloc}".lower()
+
+        entry = self.entries.get(host)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+
+        lock = self.locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            # Another crawl may have fetched it while we were waiting
+            entry = self.entries.get(host)
+            if entry and entry[1] > time.monotonic():
+                return entry[0]
+
+            rules, ttl = await self.fetch(client, host)
+            self.entries[host] = (rules, time.monotonic() + ttl)
+            return rules
+
+    async def fetch(self, client: httpx.AsyncClient, host: str) -> Tuple[Optional[RobotsRules], int]:
+        robots_url = f"{host}/robots.txt"
+        logger.info(f"Attempting to fetch robots.txt from: {robots_url}")
+        try:
+            response = await client.get(robots_url, timeout=settings.TIMEOUT, follow_redirects=True)
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not read robots.txt: {str(e)}")
+            logger.info("Proceeding without robots.txt restrictions")
+            return None, FAILED_FETCH_TTL
+
+        if response.status_code >= 400:
+            logger.info(f"No robots.txt at {robots_url} (status {response.status_code}), proceeding without restrictions")
+            ttl = FAILED_FETCH_TTL if response.status_code >= 500 else self.get_ttl(response)
+            return None, ttl
+
+        rules = RobotsRules.parse(response.text, settings.USER_AGENT)
+        logger.info(f"Successfully read robots.txt with {rules.rule_count} rules for {settings.USER_AGENT}")
+        return rules, self.get_ttl(response)
+
+
+robots_cache = RobotsCache(default_ttl=settings.ROBOTS_CACHE_TTL)
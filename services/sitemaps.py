@@ -0,0 +1,153 @@
+# services/sitemaps.py
+
+import logging
+import zlib
+from typing import List, Optional, Set
+from lxml import etree
+from urllib.parse import urlparse
+import httpx
+from config import settings
+from services.rate_limiter import host_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class SitemapEntry:
+    """A <url> of a sitemap."""
+    __slots__ = ('loc', 'lastmod', 'priority')
+
+    def __init__(self, loc: str, lastmod: Optional[str], priority: float):
+        self.loc = loc
+        self.lastmod = lastmod
+        self.priority = priority
+
+
+def child_text(element, name: str) -> Optional[str]:
+    for child in element:
+        if isinstance(child.tag, str) and etree.QName(child).localname == name:
+            return (child.text or '').strip() or None
+    return None
+
+
+class SitemapParser:
+    """Incremental sitemap parser fed with raw (possibly gzipped) chunks.
+
+    Elements are discarded as soon as they are read, so memory stays flat
+    however large the sitemap is. At most MAX_PAGE_BYTES of (decompressed) XML
+    are parsed; past that the parser is marked truncated and ignores the rest,
+    so a small .gz cannot inflate into gigabytes.
+    """
+
+    def __init__(self):
+        self.parser = etree.XMLPullParser(events=('end',), resolve_entities=False, no_network=True, huge_tree=True)
+        self.decompressor = None
+        self.started = False
+        self.bytes_parsed = 0
+        self.truncated = False
+        self.entries: List[SitemapEntry] = []
+        self.sitemaps: List[str] = []
+
+    def feed(self, chunk: bytes) -> None:
+        if not self.started:
+            self.started = True
+            # .xml.gz files are served as plain bodies, not with Content-Encoding
+            if chunk.startswith(GZIP_MAGIC):
+                self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self.decompressor is not None:
+            # Never inflate more than one byte past the limit, however well the chunk compresses
+            chunk = self.decompressor.decompress(chunk, self.bytes_left() + 1)
+        self.parse(chunk)
+
+    def close(self) -> None:
+        if self.decompressor is not None:
+            self.parse(self.decompressor.flush(self.bytes_left() + 1))
+        self.parser.close()
+        self.read_events()
+
+    def bytes_left(self) -> int:
+        return max(0, settings.MAX_PAGE_BYTES - self.bytes_parsed)
+
+    def parse(self, data: bytes) -> None:
+        if self.truncated:
+            return
+        if len(data) > self.bytes_left():
+            self.truncated = True
+            data = data[:self.bytes_left()]
+        self.bytes_parsed += len(data)
+        self.parser.feed(data)
+        self.read_events()
+
+    def read_events(self) -> None:
+        for _, element in self.parser.read_events():
+            if not isinstance(element.tag, str):
+                continue
+            name = etree.QName(element).localname
+            if name == 'url':
+                loc = child_text(element, 'loc')
+                if loc:
+                    try:
+                        priority = float(child_text(element, 'priority') or 0.5)
+                    except ValueError:
+                        priority = 0.5
+                    self.entries.append(SitemapEntry(loc, child_text(element, 'lastmod'), priority))
+            elif name == 'sitemap':
+                loc = child_text(element, 'loc')
+                if loc:
+                    self.sitemaps.append(loc)
+            else:
+                continue
+            # Drop the element and everything parsed before it
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+
+async def fetch_sitemap(client: httpx.AsyncClient, url: str, parser: SitemapParser) -> None:
+    """Stream url into parser, stopping early once SITEMAP_MAX_URLS entries or MAX_PAGE_BYTES were read."""
+    await host_rate_limiter.acquire(urlparse(url).netloc)
+    async with client.stream("GET", url, timeout=settings.TIMEOUT, follow_redirects=True) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            parser.feed(chunk)
+            if len(parser.entries) >= settings.SITEMAP_MAX_URLS:
+                # The rest of the document is never read, so it cannot be closed cleanly
+                return
+            if parser.truncated:
+                logger.warning(f"Sitemap {url} is over {settings.MAX_PAGE_BYTES} bytes, read up to that size")
+                return
+    parser.close()
+
+
+async def discover_sitemap_urls(client: httpx.AsyncClient, base_url: str, robots_sitemaps: List[str]) -> List[SitemapEntry]:
+    """Page URLs from the site's sitemaps, highest priority and most recently modified first.
+
+    Sitemaps are taken from robots.txt, falling back to /sitemap.xml. Sitemap
+    indexes are followed up to SITEMAP_MAX_FILES files in total.
+    """
+    parsed = urlparse(base_url)
+    pending = list(robots_sitemaps) or [f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"]
+    fetched: Set[str] = set()
+    entries: List[SitemapEntry] = []
+
+    while pending and len(fetched) < settings.SITEMAP_MAX_FILES and len(entries) < settings.SITEMAP_MAX_URLS:
+        sitemap_url = pending.pop(0)
+        if sitemap_url in fetched:
+            continue
+        fetched.add(sitemap_url)
+        parser = SitemapParser()
+        try:
+            await fetch_sitemap(client, sitemap_url, parser)
+        except (httpx.HTTPError, etree.XMLSyntaxError, zlib.error) as e:
+            # Keep whatever was parsed before the error
+            logger.warning(f"Could not read sitemap {sitemap_url}: {str(e)}")
+        logger.info(f"Read sitemap {sitemap_url}: {len(parser.entries)} URLs, {len(parser.sitemaps)} nested sitemaps")
+        entries.extend(parser.entries)
+        pending.extend(parser.sitemaps)
+
+    del entries[settings.SITEMAP_MAX_URLS:]
+    # ISO 8601 dates sort correctly as strings; entries without lastmod go last
+    entries.sort(key=lambda entry: entry.lastmod or '', reverse=True)
+    entries.sort(key=lambda entry: entry.priority, reverse=True)
+    return entries
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# config.Settings requires these; the tests never connect to the database or RabbitMQ
+for name in ('DB_USER', 'DB_PASSWORD', 'DB_HOST', 'DB_PORT', 'DB_NAME', 'GOOGLE_CLIENT_ID', 'GOOGLE_CLIENT_SECRET',
+             'PROJECT_NAME', 'RABBITMQ_HOST', 'RABBITMQ_PORT', 'RABBITMQ_USER', 'RABBITMQ_PASSWORD'):
+    os.environ.setdefault(name, 'test')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,106 @@
+"""Crawler.checkpoint and Crawler.from_checkpoint: a stopped crawl resumes without losing or refetching pages."""
+import asyncio
+import json
+
+from config import settings
+from crawler import Crawler
+
+BASE_URL = "https://site.test/p0"
+LAST_PAGE = 30
+
+
+def fake_site(crawler: Crawler, fetched: list) -> None:
+    """Replace fetching with a binary tree of pages /p0 .. /p30, each linking to its two children."""
+    async def process_url(url, client, depth=0):
+        page_key = crawler.normalize_url(url)
+        if page_key in crawler.processed_urls:
+            return None
+        crawler.processed_urls.add(page_key)
+        fetched.append(page_key)
+        number = int(page_key.rsplit("/p", 1)[1])
+        children = [f"/p{child}" for child in (2 * number + 1, 2 * number + 2) if child <= LAST_PAGE]
+        await crawler.extract_and_queue_urls(children, url, depth + 1)
+        await asyncio.sleep(0)
+        return {"url": page_key}
+
+    crawler.process_url = process_url
+
+
+async def crawl(crawler: Crawler, stop_after: int = None) -> list:
+    """URLs of the pages the consumer saved; with stop_after, the next page is received but never saved."""
+    saved = []
+    async for page in crawler.run_worker_pool(None):
+        if stop_after is not None and len(saved) == stop_after:
+            break
+        saved.append(page["url"])
+    return saved
+
+
+def round_trip(state: dict) -> dict:
+    # Checkpoint stores keep JSON
+    return json.loads(json.dumps(state))
+
+
+def test_resume_crawls_every_page_exactly_once():
+    crawler = Crawler(BASE_URL, "batch")
+    fake_site(crawler, [])
+    saved = asyncio.run(crawl(crawler, stop_after=10))
+    state = round_trip(crawler.checkpoint())
+
+    resumed = Crawler.from_checkpoint(state)
+    fetched = []
+    fake_site(resumed, fetched)
+    saved_after_resume = asyncio.run(crawl(resumed))
+
+    all_pages = {f"https://site.test/p{number}" for number in range(LAST_PAGE + 1)}
+    assert len(saved) == 10
+    assert set(saved).isdisjoint(saved_after_resume)
+    assert set(saved) | set(saved_after_resume) == all_pages
+    # Nothing saved before the stop is fetched again
+    assert set(fetched).isdisjoint(saved)
+    assert resumed.pages_crawled == 10
+
+
+def test_received_but_unsaved_page_is_queued_again():
+    crawler = Crawler(BASE_URL, "batch")
+    fake_site(crawler, [])
+    asyncio.run(crawl(crawler, stop_after=0))
+    state = round_trip(crawler.checkpoint())
+
+    assert BASE_URL not in state["processed"]
+    assert [entry[0] for entry in state["frontier"]["queue"]][0] == BASE_URL
+
+
+def test_checkpoint_round_trip_keeps_queue_redirects_and_retries():
+    crawler = Crawler(BASE_URL, "batch", max_depth=3, max_pages=50)
+    crawler.url_queue.add("https://site.test/a", score=5.0, depth=1)
+    crawler.url_queue.add("https://site.test/b", score=1.0, depth=2)
+    crawler.processed_urls.add("https://site.test/done")
+    crawler.redirects["https://site.test/old"] = "https://site.test/done"
+    crawler.retry_queue.append((0.0, 0, "https://site.test/flaky", 1, 2.0))
+
+    resumed = Crawler.from_checkpoint(round_trip(crawler.checkpoint()))
+
+    assert resumed.max_depth == 3 and resumed.max_pages == 50
+    assert resumed.processed_urls == {"https://site.test/done"}
+    assert resumed.redirects == {"https://site.test/old": "https://site.test/done"}
+    queued = [resumed.url_queue.pop() for _ in range(len(resumed.url_queue))]
+    assert queued[0] == ("https://site.test/a", 1, 5.0)
+    assert ("https://site.test/flaky", 1, 2.0) in queued
+    assert "https://site.test/b" in resumed.url_queue
+    assert resumed.resumed
+
+
+def test_bloom_checkpoint_omits_the_filter_and_rebuilds_it(monkeypatch):
+    monkeypatch.setattr(settings, "FRONTIER_BLOOM_FILTER", True)
+    monkeypatch.setattr(settings, "FRONTIER_BLOOM_CAPACITY", 1000)
+    crawler = Crawler(BASE_URL, "batch")
+    fake_site(crawler, [])
+    saved = asyncio.run(crawl(crawler, stop_after=5))
+    state = round_trip(crawler.checkpoint())
+    assert state["frontier"]["seen"] is None
+
+    resumed = Crawler.from_checkpoint(state)
+    # Saved and queued pages are both remembered, so neither is queued a second time
+    for url in saved + [entry[0] for entry in state["frontier"]["queue"]]:
+        assert not resumed.url_queue.add(url)
@@ -0,0 +1,82 @@
+"""Frontier: score ordering, deduplication by key, the Bloom filter mode and snapshots."""
+from services.frontier import BloomFilter, Frontier
+
+
+def drain(frontier: Frontier) -> list:
+    return [frontier.pop() for _ in range(len(frontier))]
+
+
+def test_highest_score_first_and_ties_in_insertion_order():
+    frontier = Frontier()
+    frontier.add("/low", score=1.0, depth=3)
+    frontier.add("/high", score=9.0, depth=1)
+    frontier.add("/tie-a", score=5.0, depth=2)
+    frontier.add("/tie-b", score=5.0, depth=2)
+
+    assert drain(frontier) == [("/high", 1, 9.0), ("/tie-a", 2, 5.0), ("/tie-b", 2, 5.0), ("/low", 3, 1.0)]
+
+
+def test_each_key_is_queued_once():
+    frontier = Frontier(key=lambda url: url.lower().rstrip("/"))
+    assert frontier.add("/Page/")
+    assert not frontier.add("/page")
+    assert not frontier.add("/PAGE", score=100.0)
+    assert frontier.extend(["/a", "/b", "/a"]) == 2
+    assert frontier.enqueued == 3
+    # Popping does not forget a URL
+    drain(frontier)
+    assert not frontier.add("/page")
+    assert "/page/" in frontier
+
+
+def test_remembered_urls_are_never_queued():
+    frontier = Frontier()
+    frontier.remember("/redirect-target")
+    assert not frontier.add("/redirect-target")
+    assert len(frontier) == 0
+
+
+def test_bloom_filter_mode_deduplicates():
+    frontier = Frontier(bloom_capacity=1000, bloom_error_rate=0.001)
+    assert isinstance(frontier.seen, BloomFilter)
+    added = [frontier.add(f"/page/{number}") for number in range(500)]
+    assert all(added)
+    assert not any(frontier.add(f"/page/{number}") for number in range(500))
+    assert len(frontier) == 500
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    for number in range(10000):
+        bloom.add(f"https://site.test/{number}")
+    assert all(f"https://site.test/{number}" in bloom for number in range(10000))
+    false_positives = sum(f"https://other.test/{number}" in bloom for number in range(10000))
+    assert false_positives < 300
+
+
+def test_snapshot_keeps_order_and_puts_unfinished_entries_back():
+    frontier = Frontier()
+    for number, score in enumerate([3.0, 7.0, 5.0]):
+        frontier.add(f"/{number}", score=score, depth=number)
+    in_flight = frontier.pop()
+
+    restored = Frontier.from_state(frontier.to_state(unfinished=[in_flight]))
+
+    assert drain(restored) == [("/1", 1, 7.0), ("/2", 2, 5.0), ("/0", 0, 3.0)]
+    assert restored.enqueued == 3
+    assert not restored.add("/2")
+
+
+def test_bloom_snapshot_is_rebuilt_from_queue_and_remembered_keys():
+    frontier = Frontier(bloom_capacity=1000)
+    frontier.add("/saved")
+    frontier.add("/queued")
+    frontier.pop()
+    state = frontier.to_state()
+    assert state["seen"] is None
+
+    restored = Frontier.from_state(state, bloom_capacity=1000, remembered=["/saved"])
+    assert isinstance(restored.seen, BloomFilter)
+    assert not restored.add("/saved")
+    assert not restored.add("/queued")
+    assert restored.add("/new")
@@ -0,0 +1,125 @@
+"""HostLimit: AIMD window and rate, Retry-After pauses, and slots held by acquire."""
+import asyncio
+
+import pytest
+
+from services import host_concurrency
+from services.host_concurrency import HostLimit, RequestOutcome, parse_retry_after
+from services.rate_limiter import TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(host_concurrency.time, "monotonic", clock)
+    return clock
+
+
+def make_limit(initial: int = 2) -> HostLimit:
+    return HostLimit(min_limit=1, max_limit=8, initial=initial, increase=1.0, decrease_factor=0.5,
+                     latency_factor=3.0, bucket=TokenBucket(rate=1.0, burst=2), min_rate=0.2, max_rate=20.0,
+                     rate_increase=0.5)
+
+
+def respond(limit: HostLimit, status_code: int = 200, latency: float = 0.1, retry_after: str = None,
+            failed: bool = False) -> None:
+    outcome = RequestOutcome()
+    if failed:
+        outcome.failed = True
+    else:
+        outcome.record_status(status_code, retry_after, latency)
+    limit.in_flight += 1
+    limit.release(outcome)
+
+
+def test_healthy_responses_grow_window_and_rate_up_to_their_caps(clock):
+    limit = make_limit()
+    respond(limit)
+    assert 2 < limit.limit < 3
+    assert 1.0 < limit.bucket.rate < 2.0
+
+    for _ in range(2000):
+        respond(limit)
+    assert limit.limit == 8
+    assert limit.bucket.rate == 20.0
+
+
+def test_overload_halves_window_and_rate(clock):
+    limit = make_limit(initial=8)
+    limit.bucket.set_rate(10.0)
+    respond(limit, status_code=503)
+    assert limit.limit == 4
+    assert limit.bucket.rate == 5.0
+    assert limit.last_decrease_reason == "status 503"
+    assert limit.stats["errors"] == 1
+
+
+def test_one_decrease_per_cooldown(clock):
+    limit = make_limit(initial=8)
+    for _ in range(5):
+        respond(limit, status_code=502)
+    assert limit.limit == 4
+    clock.now += 1.5
+    respond(limit, failed=True)
+    assert limit.limit == 2
+    assert limit.last_decrease_reason == "errors"
+
+
+def test_decreases_stop_at_the_floors(clock):
+    limit = make_limit(initial=1)
+    for _ in range(20):
+        respond(limit, status_code=429)
+        clock.now += 2
+    assert limit.limit == 1
+    assert limit.bucket.rate == 0.2
+
+
+def test_retry_after_pauses_the_host(clock):
+    limit = make_limit(initial=4)
+    respond(limit, status_code=429, retry_after="30")
+    assert limit.paused_until == clock.now + 30
+    assert limit.stats["retry_after_pauses"] == 1
+    assert limit.limit == 2
+    # A Retry-After on a healthy status is not an overload signal
+    respond(limit, status_code=200, retry_after="30")
+    assert limit.stats["retry_after_pauses"] == 1
+
+
+def test_latency_far_above_the_best_is_overload(clock):
+    limit = make_limit(initial=4)
+    respond(limit, latency=0.1)
+    for _ in range(10):
+        respond(limit, latency=2.0)
+        clock.now += 5
+    assert limit.stats["decreases"] >= 1
+    assert limit.last_decrease_reason == "latency"
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_acquire_waits_for_a_free_slot():
+    async def run():
+        limit = make_limit(initial=2)
+        await limit.acquire()
+        await limit.acquire()
+        waiting = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        limit.release(RequestOutcome())
+        await asyncio.wait_for(waiting, timeout=1)
+        assert limit.in_flight == 2
+
+    asyncio.run(run())
@@ -0,0 +1,104 @@
+"""CrawlerTransport against a local server: responses, host slots, connection counts and httpx errors."""
+import asyncio
+import socket
+
+import httpx
+import pytest
+
+from services.http_client import CrawlerTransport
+
+LIMITS = httpx.Limits(max_connections=10, max_keepalive_connections=10, keepalive_expiry=30)
+
+
+async def serve(handler):
+    server = await asyncio.start_server(handler, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def respond_ok(reader, writer):
+    # Keep-alive HTTP/1.1: answer every request on the connection until the client closes it
+    try:
+        while True:
+            await reader.readuntil(b"\r\n\r\n")
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\nContent-Length: 2\r\n\r\nok")
+            await writer.drain()
+    except asyncio.IncompleteReadError:
+        writer.close()
+
+
+async def never_respond(reader, writer):
+    # Until the client gives up and closes the connection
+    await reader.read()
+    writer.close()
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_client(max_per_host: int = 4):
+    transport = CrawlerTransport(max_per_host=max_per_host, dns_ttl=60, http2=False, limits=LIMITS)
+    return transport, httpx.AsyncClient(transport=transport)
+
+
+def test_request_through_transport():
+    async def run():
+        server, port = await serve(respond_ok)
+        transport, client = make_client(max_per_host=1)
+        async with server, client:
+            # With one slot per host, the second request only gets through if the first released it
+            for _ in range(2):
+                response = await client.get(f"http://localhost:{port}/")
+                assert response.status_code == 200
+                assert response.text == "ok"
+                assert response.headers["content-type"] == "text/html"
+                assert response.http_version == "HTTP/1.1"
+                assert response.reason_phrase == "OK"
+            stats = transport.network_backend.stats
+            assert stats["connections_opened"] == 1
+            assert stats["open_connections"] == 1
+            assert stats["dns_misses"] == 1
+        assert stats["open_connections"] == 0
+
+    asyncio.run(run())
+
+
+def test_streamed_response_releases_host_slot():
+    async def run():
+        server, port = await serve(respond_ok)
+        transport, client = make_client(max_per_host=1)
+        async with server, client:
+            async with client.stream("GET", f"http://localhost:{port}/") as response:
+                assert await response.aread() == b"ok"
+            response = await asyncio.wait_for(client.get(f"http://localhost:{port}/"), timeout=5)
+            assert response.status_code == 200
+
+    asyncio.run(run())
+
+
+def test_connect_error_is_an_httpx_error():
+    async def run():
+        transport, client = make_client(max_per_host=1)
+        async with client:
+            for _ in range(2):
+                with pytest.raises(httpx.ConnectError):
+                    await client.get(f"http://127.0.0.1:{unused_port()}/")
+            assert transport.network_backend.stats["open_connections"] == 0
+
+    asyncio.run(run())
+
+
+def test_read_timeout_is_an_httpx_error():
+    async def run():
+        server, port = await serve(never_respond)
+        transport, client = make_client(max_per_host=1)
+        async with server, client:
+            with pytest.raises(httpx.ReadTimeout):
+                await client.get(f"http://127.0.0.1:{port}/", timeout=0.2)
+            # The failed request gave its host slot back
+            with pytest.raises(httpx.ReadTimeout):
+                await asyncio.wait_for(client.get(f"http://127.0.0.1:{port}/", timeout=0.2), timeout=5)
+
+    asyncio.run(run())
@@ -0,0 +1,59 @@
+"""Both HTML_PARSER_BACKEND values must extract the same page."""
+import pytest
+
+pytest.importorskip("selectolax")
+
+from config import settings
+from crawler import extract_page
+
+COMPARED_FIELDS = ('title', 'meta_description', 'h1', 'h2', 'h3', 'full_text', 'word_count')
+
+FIXTURES = {
+    "headings": (
+        "<html><head><title>Guide</title><meta name='description' content='About things'></head><body>"
+        "<h1>Main</h1><p>" + "intro text " * 30 + "</p><h2>Second</h2><p>more words here</p>"
+        "<h3>Third</h3><p>" + "detail " * 20 + "</p></body></html>"
+    ),
+    "lists": (
+        "<html><head><title>Lists</title></head><body><h1>Shopping</h1><p>" + "words " * 40 + "</p>"
+        "<ul><li>Apples</li><li>Pears and <b>plums</b></li></ul><ol><li>One</li><li>Two</li></ol></body></html>"
+    ),
+    "tables": (
+        "<html><head><title>Table</title></head><body><h1>Prices</h1><p>" + "pricing text " * 30 + "</p>"
+        "<table><tr><th>Plan</th><th>Price</th></tr><tr><td>Basic</td><td>$10</td></tr>"
+        "<tr><td>Pro</td><td>$20</td></tr></table></body></html>"
+    ),
+    "nested_wrappers": (
+        "<html><head><title>Nested</title></head><body>" + "<div class='wrapper'>" * 40 +
+        "<h1>Deep</h1><section><p>" + "nested words " * 40 + "</p></section>" + "</div>" * 40 + "</body></html>"
+    ),
+    # Deeper than libxml2's default limit of 255 levels
+    "very_deep_nesting": (
+        "<html><head><title>Deep</title></head><body>" + "<div>" * 300 +
+        "<h1>Deep heading</h1><p>" + "word " * 80 + "</p>" + "</div>" * 300 + "</body></html>"
+    ),
+    "title_with_markup": (
+        "<html><head><title>Brand <b>Name</b> &amp; Co</title></head><body><h1>Hello</h1><p>" +
+        "body " * 60 + "</p></body></html>"
+    ),
+}
+
+
+def extract_with(backend: str, html: str, monkeypatch) -> dict:
+    monkeypatch.setattr(settings, "HTML_PARSER_BACKEND", backend)
+    return extract_page(html.encode("utf-8"), "https://example.com/page", "utf-8")
+
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_backends_extract_the_same_page(name, monkeypatch):
+    lxml_page = extract_with("lxml", FIXTURES[name], monkeypatch)
+    selectolax_page = extract_with("selectolax", FIXTURES[name], monkeypatch)
+    assert lxml_page["h1"]
+    for field in COMPARED_FIELDS:
+        assert lxml_page[field] == selectolax_page[field], field
+
+
+def test_title_markup_is_dropped(monkeypatch):
+    # Browsers show markup inside <title> as text; both backends keep only the words
+    for backend in ("lxml", "selectolax"):
+        assert extract_with(backend, FIXTURES["title_with_markup"], monkeypatch)["title"] == "Brand Name & Co"